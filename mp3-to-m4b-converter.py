@@ -1,7 +1,12 @@
+import json
 import os
 import subprocess
 import sys
-import json
+
+from src.core.parts import convert_parts
+from src.core.probe import get_durations
+from src.core.repeats import apply_trims, find_repeats
+from src.core.verify import print_report
 
 # User-configurable variables
 INPUT_FOLDER = "inputs"
@@ -9,134 +14,107 @@ OUTPUT_FOLDER = "outputs"
 TITLE = "Write the title"
 AUTHOR = "Write the name of the author"
 MERGE = True  # Set to True for simple merge without chapters
+VERIFY = True  # Check the finished file (duration, chapters, tags, full decode)
+COVER = None  # Optional path to a PNG/JPG cover image
+# Where the file index (moov) goes: "reserve" puts it at the front without
+# rewriting the file, "faststart" rewrites the whole file after encoding,
+# "plain" leaves it at the end
+OUTPUT_LAYOUT = "reserve"
+BITRATE = "128k"  # Or "auto" to pick bitrate, sample rate and mono/stereo from the sources
+# Extra renditions encoded from a single decode, e.g.
+# [{"name": "mobile", "bitrate": "64k", "channels": 1},
+#  {"name": "desktop", "bitrate": "128k", "channels": 2}]
+# Leave empty for one file at BITRATE. A rendition's bitrate may also be "auto".
+RENDITIONS = []
+# Split the book into parts, at chapter boundaries, that stay under these
+# limits (None = no limit); the parts are encoded in parallel
+MAX_PART_HOURS = None
+MAX_PART_MB = None
+DETECT_REPEATS = False  # Look for intros/outros repeated across inputs and offer to trim them
 
-def get_duration(file_path):
-    """Get audio duration in seconds using ffprobe."""
-    cmd = [
-        "ffprobe",
-        "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "json",
-        file_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    data = json.loads(result.stdout)
-    return float(data['format']['duration'])
-
-def create_chapter_metadata(mp3_files, metadata_path):
-    """Create FFmpeg metadata file with chapter information."""
-    start_time = 0.0
-    
-    with open(metadata_path, 'w') as f:
-        f.write(";FFMETADATA1\n")
-        for mp3 in mp3_files:
-            file_path = os.path.join(INPUT_FOLDER, mp3)
-            duration = get_duration(file_path)
-            chapter_title = os.path.splitext(mp3)[0].replace("_", " ")
-            
-            f.write("[CHAPTER]\n")
-            f.write("TIMEBASE=1/1000\n")
-            f.write(f"START={int(start_time * 1000)}\n")
-            f.write(f"END={int((start_time + duration) * 1000)}\n")
-            f.write(f"title={chapter_title}\n\n")
-            
-            start_time += duration
-
-def merge_mp3s(mp3_files, output_path):
-    """Merge multiple MP3 files into one, preserving original streams."""
-    filelist_path = os.path.join(OUTPUT_FOLDER, "merge_list.txt")
-    
-    with open(filelist_path, 'w') as f:
-        for mp3 in mp3_files:
-            input_path = os.path.abspath(os.path.join(INPUT_FOLDER, mp3))
-            f.write(f"file '{input_path}'\n")
-    
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-f", "concat",
-        "-safe", "0",
-        "-i", filelist_path,
-        "-c", "copy",
-        output_path
-    ]
-    
-    try:
-        print("Merging MP3 files...")
-        subprocess.run(cmd, check=True)
-    finally:
-        if os.path.exists(filelist_path):
-            os.remove(filelist_path)
+def show_progress(pct):
+    print(f"\rProgress: {pct:5.1f}%", end="", flush=True)
+
+def format_time(secs):
+    return f"{int(secs // 60):02d}:{secs % 60:04.1f}"
+
+def offer_trims(chapters):
+    """Find repeated intros/outros and ask whether to trim them."""
+    print("Looking for repeated intros/outros...")
+    repeats = find_repeats(chapters)
+    if not repeats:
+        print("No repeated intros/outros found.")
+        return chapters
+
+    for r in repeats:
+        kind = "intro" if r["part"] == "head" else "outro"
+        print(f"  {chapters[r['chapter']]['name']}: {kind} {format_time(r['start'])}-{format_time(r['end'])} "
+              f"(same as in {chapters[r['matches']]['name']})")
+    answer = input("Trim these, keeping the first occurrence? [y/N] ").strip().lower()
+    return apply_trims(chapters, repeats) if answer == "y" else chapters
 
 def main():
     os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-    
-    input_folder = INPUT_FOLDER
-    
-    mp3_files = sorted([f for f in os.listdir(input_folder) if f.lower().endswith('.mp3')])
+
+    mp3_files = sorted([f for f in os.listdir(INPUT_FOLDER) if f.lower().endswith('.mp3')])
     if not mp3_files:
         print("Error: No MP3 files found in input folder")
         sys.exit(1)
 
-    final_mp3 = os.path.join(OUTPUT_FOLDER, "merged_temp.mp3") if MERGE else None
-    filelist_path = os.path.join(OUTPUT_FOLDER, "filelist.txt")
-    metadata_path = os.path.join(OUTPUT_FOLDER, "metadata.txt")
-
-    if MERGE:
-        merge_mp3s(mp3_files, final_mp3)
-        mp3_files = ["merged_temp.mp3"]
-        input_folder = OUTPUT_FOLDER
-
-    with open(filelist_path, 'w') as f:
-        for mp3 in mp3_files:
-            input_path = os.path.abspath(os.path.join(input_folder, mp3))
-            f.write(f"file '{input_path}'\n")
+    paths = [os.path.join(INPUT_FOLDER, mp3) for mp3 in mp3_files]
+    chapters = [
+        {
+            "path": path,
+            "name": os.path.splitext(mp3)[0].replace("_", " "),
+            "duration": duration
+        }
+        for mp3, path, duration in zip(mp3_files, paths, get_durations(paths))
+    ]
 
-    if not MERGE:
-        create_chapter_metadata(mp3_files, metadata_path)
-    else:
-        with open(metadata_path, 'w') as f:
-            f.write(";FFMETADATA1\n")
+    if DETECT_REPEATS and len(chapters) > 1:
+        chapters = offer_trims(chapters)
 
     output_filename = f"{TITLE}.m4b".replace(" ", "_")
     output_path = os.path.join(OUTPUT_FOLDER, output_filename)
 
-    cmd = [
-        "ffmpeg",
-        "-y",
-        "-f", "concat",
-        "-safe", "0",
-        "-i", filelist_path,
-        "-i", metadata_path,
-        "-map", "0:a",
-        "-map_metadata", "1",
-        "-c:a", "aac",
-        "-b:a", "128k",
-        "-metadata", f"title={TITLE}",
-        "-metadata", f"artist={AUTHOR}",
-        "-movflags", "+faststart",
-        output_path
-    ]
-
     try:
         print("Starting conversion...")
-        subprocess.run(cmd, check=True)
-    except subprocess.CalledProcessError:
-        print("\nConversion failed. Check FFmpeg output above for details.")
+        report = convert_parts(
+            chapters, output_path, TITLE, AUTHOR,
+            max_seconds=MAX_PART_HOURS and MAX_PART_HOURS * 3600,
+            max_bytes=MAX_PART_MB and MAX_PART_MB * 1024 * 1024,
+            merge=MERGE, cover_path=COVER, bitrate=BITRATE, renditions=RENDITIONS, layout=OUTPUT_LAYOUT,
+            verify=VERIFY, on_progress=show_progress
+        )
+    except subprocess.CalledProcessError as e:
+        print(f"\n{e.stderr or ''}")
+        print("Conversion failed. Check FFmpeg output above for details.")
         sys.exit(1)
-    finally:
-        cleanup_files = [filelist_path, metadata_path]
-        if MERGE:
-            cleanup_files.append(final_mp3)
-            
-        for f in cleanup_files:
-            try:
-                if os.path.exists(f):
-                    os.remove(f)
-            except Exception as e:
-                print(f"Error cleaning up file {f}: {e}")
-
-    print(f"\nSuccessfully created audiobook: {output_path}")
+    print()
+
+    profile = report["profile"]
+    if profile:
+        source = profile["source"]
+        print(f"Auto profile: {profile['channels']} ch, {profile['sample_rate']} Hz, {profile['bitrate']} "
+              f"({profile['reason']}; source {source['channels']} ch, "
+              f"{source['sample_rate']} Hz, {source['bitrate']})")
+
+    if "parts" in report:
+        print(f"Split into {len(report['parts'])} parts")
+    print(f"Wrote {report['bytes_written'] / 1024 / 1024:.1f} MB ({report['layout']} layout)")
+
+    report_path = os.path.splitext(output_path)[0] + ".report.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if VERIFY:
+        for output in report["outputs"]:
+            print_report(output["verify"])
+        if not report["ok"]:
+            sys.exit(1)
+
+    for output in report["outputs"]:
+        print(f"\nSuccessfully created audiobook: {output['path']}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,40 +1,149 @@
 # pip install openai-whisper pydub
 import whisper
+import numpy as np
+import json
+import os
+import subprocess
 import sys
 
 # Configuration
 MP3_PATH = "inputs/file-3.mp3"
 OUTPUT_TXT = "transcript.txt"
+OUTPUT_SEGMENTS = "transcript.segments.jsonl"  # Timestamped segments, for utils/transcript_index.py
 MODEL_SIZE = "large-v3"
+STREAMING = True  # Decode in fixed windows so memory doesn't grow with audio length
+WINDOW_SECONDS = 300
+OVERLAP_SECONDS = 10
+
+SAMPLE_RATE = 16000  # What Whisper expects
+
+TRANSCRIBE_OPTIONS = dict(
+    verbose=True,
+    no_speech_threshold=0.45,
+    compression_ratio_threshold=2.4,
+    fp16=False  # Disable if using CPU
+)
 
 def transcribe_audio(audio_path, model_size):
     """
     Loads a Whisper model and transcribes the given audio file.
-    Returns the plain text transcription.
+    Returns Whisper's result, with the plain text and timestamped segments.
     """
     print("Loading Whisper model...")
     model = whisper.load_model(model_size)
     
     print("Transcribing audio...")
-    result = model.transcribe(
-        audio_path,
-        verbose=True,
-        no_speech_threshold=0.45,
-        compression_ratio_threshold=2.4,
-        fp16=False  # Disable if using CPU
-    )
-    return result["text"]
+    return model.transcribe(audio_path, **TRANSCRIBE_OPTIONS)
+
+def write_segments_header(seg_file, audio_path):
+    """The first line names the transcribed file, so the index can find its chapters."""
+    seg_file.write(json.dumps({"source": os.path.abspath(audio_path)}) + "\n")
+
+def write_segments(seg_file, segments, offset=0.0):
+    """Append segments as JSON lines with start/end in seconds from the start of the file."""
+    for segment in segments:
+        seg_file.write(json.dumps({
+            "start": round(offset + segment["start"], 3),
+            "end": round(offset + segment["end"], 3),
+            "text": segment["text"].strip()
+        }, ensure_ascii=False) + "\n")
+
+def read_samples(stream, count):
+    """Read up to count 16-bit mono samples from the ffmpeg pipe as float32."""
+    data = stream.read(count * 2)
+    data = data[:len(data) - len(data) % 2]
+    return np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+def transcribe_streaming(audio_path, model_size, output_path, segments_path,
+                         window_seconds=WINDOW_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+    """
+    Transcribes the audio window by window from an ffmpeg pipe.
+
+    Only one window of 16 kHz PCM is held in memory at a time. Segments
+    that end before the last overlap_seconds of a window are final and are
+    appended to output_path (and, with their timestamps, to segments_path)
+    right away; the next window starts where the last finished segment
+    ended, so nothing is cut or transcribed twice.
+    """
+    print("Loading Whisper model...")
+    model = whisper.load_model(model_size)
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", audio_path,
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-"
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    buffer = np.empty(0, np.float32)
+    offset = 0.0
+    previous_text = ""
+
+    print("Transcribing audio...")
+    try:
+        with open(output_path, "w", encoding="utf-8") as txt_file, \
+                open(segments_path, "w", encoding="utf-8") as seg_file:
+            write_segments_header(seg_file, audio_path)
+            while True:
+                need = window_samples - len(buffer)
+                chunk = read_samples(process.stdout, need)
+                at_end = len(chunk) < need
+                buffer = np.concatenate((buffer, chunk))
+                if len(buffer) == 0:
+                    break
+
+                result = model.transcribe(
+                    buffer,
+                    initial_prompt=previous_text[-200:] or None,
+                    **TRANSCRIBE_OPTIONS
+                )
+                segments = result["segments"]
+                if not at_end:
+                    limit = len(buffer) / SAMPLE_RATE - overlap_seconds
+                    segments = [s for s in segments if s["end"] <= limit]
+
+                for segment in segments:
+                    txt_file.write(segment["text"])
+                    previous_text += segment["text"]
+                previous_text = previous_text[-200:]
+                write_segments(seg_file, segments, offset)
+                txt_file.flush()
+                seg_file.flush()
+
+                if at_end:
+                    break
+
+                consumed = segments[-1]["end"] if segments else limit
+                cut = max(1, int(consumed * SAMPLE_RATE))
+                buffer = buffer[cut:]
+                offset += cut / SAMPLE_RATE
+                print(f"Transcribed up to {offset:.0f}s")
+    finally:
+        process.stdout.close()
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode {audio_path}")
 
 def main():
     try:
-        # Transcribe and get the raw text
-        transcript_text = transcribe_audio(MP3_PATH, MODEL_SIZE)
-        
-        # Save to .txt file
-        with open(OUTPUT_TXT, "w", encoding="utf-8") as txt_file:
-            txt_file.write(transcript_text)
+        if STREAMING:
+            transcribe_streaming(MP3_PATH, MODEL_SIZE, OUTPUT_TXT, OUTPUT_SEGMENTS)
+        else:
+            # Transcribe and get the raw text and segments
+            result = transcribe_audio(MP3_PATH, MODEL_SIZE)
+            
+            # Save to .txt file
+            with open(OUTPUT_TXT, "w", encoding="utf-8") as txt_file:
+                txt_file.write(result["text"])
+            with open(OUTPUT_SEGMENTS, "w", encoding="utf-8") as seg_file:
+                write_segments_header(seg_file, MP3_PATH)
+                write_segments(seg_file, result["segments"])
         
-        print(f"Transcription saved to {OUTPUT_TXT}")
+        print(f"Transcription saved to {OUTPUT_TXT} (segments in {OUTPUT_SEGMENTS})")
         
     except Exception as e:
         print(f"An error occurred: {str(e)}")
@@ -1,6 +1,3 @@
 # src/__init__.py
 from .version import __version__
 __all__ = ['M4BFusionPro', 'CoverArtWidget', 'ToggleSwitch']  #main classes
-
-# Package initialization code
-print(f"Initializing M4B Fusion Pro v{__version__}")
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Headless conversion core shared by the CLI and the GUI.
+
+Nothing here imports Qt or PIL. Submodules are only imported when one of
+their names is first used, so `import core` (or `src.core`) stays cheap
+for batch callers that start many short-lived processes.
+"""
+import importlib
+
+# Names must not collide with submodule names: importing a submodule
+# binds it as an attribute of the package and would shadow the export
+_EXPORTS = {
+    "get_duration": "probe",
+    "get_durations": "probe",
+    "chapter_entries": "chapters",
+    "write_ffmetadata": "chapters",
+    "read_ffmetadata_chapters": "chapters",
+    "probed_chapter_entries": "chapters",
+    "write_filelist": "command",
+    "build_convert_command": "command",
+    "build_cover_command": "command",
+    "run_ffmpeg": "runner",
+    "time_to_seconds": "runner",
+    "ConversionCancelled": "runner",
+    "convert_book": "convert",
+    "convert_parts": "parts",
+    "plan_parts": "parts",
+    "verify_m4b": "verify",
+    "print_report": "verify",
+    "export_chapters": "export",
+    "find_repeats": "repeats",
+    "apply_trims": "repeats",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,23 @@
+import hashlib
+import os
+import sys
+
+
+def cache_dir(*parts):
+    """Return (and create) a folder in the per-user cache for this app."""
+    if sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    elif os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    folder = os.path.join(base, "m4bfusion", *parts)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def file_key(path):
+    """Cache key that changes whenever the file is replaced or modified."""
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
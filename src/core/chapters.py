@@ -0,0 +1,81 @@
+def escape_ffmetadata(value):
+    """Escape the characters FFMETADATA treats specially in values."""
+    for ch in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(ch, "\\" + ch)
+    return value
+
+
+def unescape_ffmetadata(value):
+    out = []
+    chars = iter(value)
+    for ch in chars:
+        out.append(next(chars, "") if ch == "\\" else ch)
+    return "".join(out)
+
+
+def chapter_entries(chapters):
+    """
+    Lay chapters end to end.
+
+    chapters are dicts with "name" and "duration" (seconds), as used by
+    both frontends. Returns dicts with "title", "start" and "end" in ms.
+    """
+    entries = []
+    current_time = 0.0
+    for c in chapters:
+        end_time = current_time + c["duration"]
+        entries.append({
+            "title": c["name"],
+            "start": int(current_time * 1000),
+            "end": int(end_time * 1000)
+        })
+        current_time = end_time
+    return entries
+
+
+def probed_chapter_entries(info):
+    """Chapter entries (times in ms) from ffprobe's -show_chapters output."""
+    return [
+        {
+            "title": c.get("tags", {}).get("title", ""),
+            "start": int(round(float(c["start_time"]) * 1000)),
+            "end": int(round(float(c["end_time"]) * 1000))
+        }
+        for c in info.get("chapters", [])
+    ]
+
+
+def write_ffmetadata(entries, metadata_path):
+    """Write chapter entries to an FFMETADATA1 file."""
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        f.write(";FFMETADATA1\n")
+        for e in entries:
+            f.write(
+                f"[CHAPTER]\n"
+                f"TIMEBASE=1/1000\n"
+                f"START={e['start']}\n"
+                f"END={e['end']}\n"
+                f"title={escape_ffmetadata(e['title'])}\n\n"
+            )
+
+
+def read_ffmetadata_chapters(metadata_path):
+    """Parse the [CHAPTER] sections of an FFMETADATA1 file into dicts (times in ms)."""
+    chapters = []
+    current = None
+    with open(metadata_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line == "[CHAPTER]":
+                current = {"title": "", "start": 0, "end": 0}
+                chapters.append(current)
+            elif line.startswith("["):
+                current = None
+            elif current is not None and "=" in line:
+                key, value = line.split("=", 1)
+                key = key.upper()
+                if key in ("START", "END"):
+                    current[key.lower()] = int(value)
+                elif key == "TITLE":
+                    current["title"] = unescape_ffmetadata(value)
+    return chapters
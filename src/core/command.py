@@ -0,0 +1,84 @@
+import os
+
+from .layout import PLAIN, layout_args
+
+
+def write_filelist(chapters, filelist_path):
+    """
+    Write an ffmpeg concat demuxer list for the given chapters.
+
+    chapters are dicts with "path" and optionally "inpoint"/"outpoint"
+    (seconds) to use only part of a file.
+    """
+    with open(filelist_path, "w", encoding="utf-8") as f:
+        for ch in chapters:
+            # Single quotes are closed, escaped and reopened
+            quoted = os.path.abspath(ch["path"]).replace("'", "'\\''")
+            f.write(f"file '{quoted}'\n")
+            if ch.get("inpoint"):
+                f.write(f"inpoint {ch['inpoint']:.3f}\n")
+            if ch.get("outpoint") is not None:
+                f.write(f"outpoint {ch['outpoint']:.3f}\n")
+
+
+def build_convert_command(filelist_path, outputs, title, author, metadata_path=None,
+                          cover_path=None, layout=PLAIN):
+    """
+    Build the ffmpeg command that encodes a concat list into one or more M4Bs.
+
+    outputs are dicts with "path" and "bitrate", and optionally "channels",
+    "sample_rate" and "moov_size" (needed for the reserve layout). The
+    inputs are decoded once and the decoded audio is fanned out to one
+    AAC encoder per output, each getting the same chapters, tags and
+    cover. Chapters come from metadata_path (an FFMETADATA file) when
+    given; without it the book is a single track.
+    """
+    cmd = [
+        "ffmpeg", "-y",
+        "-f", "concat", "-safe", "0",
+        "-i", filelist_path
+    ]
+    next_input = 1
+    if metadata_path:
+        cmd += ["-i", metadata_path]
+        metadata_input = next_input
+        next_input += 1
+    if cover_path:
+        cmd += ["-i", cover_path]
+        cover_input = next_input
+
+    for output in outputs:
+        if metadata_path:
+            cmd += ["-map_metadata", str(metadata_input)]
+        cmd += [
+            "-map", "0:a",
+            "-c:a", "aac", "-b:a", output["bitrate"]
+        ]
+        if output.get("channels"):
+            cmd += ["-ac", str(output["channels"])]
+        if output.get("sample_rate"):
+            cmd += ["-ar", str(output["sample_rate"])]
+        cmd += [
+            "-metadata", f"title={title}",
+            "-metadata", f"artist={author}"
+        ]
+        if cover_path:
+            cmd += [
+                "-map", f"{cover_input}:v",
+                "-c:v", "copy",
+                "-disposition:v", "attached_pic"
+            ]
+        cmd += layout_args(layout, output.get("moov_size"))
+        cmd.append(output["path"])
+    return cmd
+
+
+def build_cover_command(src, dest):
+    """Re-encode a cover image to an even-sized baseline JPEG MP4 players accept."""
+    return [
+        "ffmpeg", "-y",
+        "-i", src,
+        "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2,format=yuvj420p",
+        "-q:v", "2", "-frames:v", "1",
+        dest
+    ]
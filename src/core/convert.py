@@ -0,0 +1,172 @@
+import os
+import subprocess
+import tempfile
+import time
+
+from .chapters import chapter_entries, write_ffmetadata
+from .command import write_filelist, build_convert_command, build_cover_command
+from .layout import FASTSTART, RESERVE, bytes_written, estimate_moov_size, is_moov_overflow
+from .profile import AUTO, choose_profile
+from .runner import ConversionCancelled, run_ffmpeg, run_quiet
+
+
+def rendition_path(out_file, name):
+    """Output path for a named rendition, e.g. Book.m4b -> Book_mobile.m4b."""
+    root, ext = os.path.splitext(out_file)
+    return f"{root}_{name}{ext}"
+
+
+def convert_book(chapters, out_file, title, author, merge=False, cover_path=None,
+                 bitrate="128k", renditions=None, layout=RESERVE, verify=True,
+                 workdir=None, on_progress=None, cancel_event=None, profile=None):
+    """
+    Encode a list of chapters into an M4B file.
+
+    chapters are dicts with "path", "name" and "duration" (seconds), and
+    optionally "inpoint"/"outpoint" to use only part of a file (see
+    repeats.apply_trims). With merge=True the book is written without
+    chapter markers.
+
+    renditions optionally lists several encodes to produce from a single
+    decode of the inputs, as dicts with "name", "bitrate" and optionally
+    "channels" and "sample_rate"; each is written next to out_file with
+    its name as a suffix. Without it one file is encoded at bitrate.
+    A bitrate of "auto" picks channels, sample rate and bitrate from the
+    sources (see profile.choose_profile), or uses profile if one is given;
+    the decisions are recorded in report["profile"].
+
+    layout controls where the moov atom goes (see layout.py). The default
+    reserves room for it at the front, sized from the duration, chapters
+    and cover, so the file is streaming-friendly without the full second
+    write that +faststart does; if the estimate turns out too small the
+    encode is redone with faststart. report["bytes_written"] counts every
+    byte written to disk.
+
+    Temporary files go to a private workspace inside workdir (the system
+    temp folder by default) that is removed afterwards, so several
+    conversions can run at once, even into the same output folder.
+    Setting cancel_event at any point before the report is returned, also
+    during verification, stops the work, removes the outputs and raises
+    ConversionCancelled.
+
+    Returns a run report dict; report["outputs"] has one entry per file
+    written, with its verification result when verify=True, and
+    report["ok"] is False if any of them failed.
+    """
+    if renditions:
+        outputs = [
+            {
+                "name": r["name"],
+                "path": rendition_path(out_file, r["name"]),
+                "bitrate": r["bitrate"],
+                "channels": r.get("channels"),
+                "sample_rate": r.get("sample_rate"),
+            }
+            for r in renditions
+        ]
+    else:
+        outputs = [{"path": out_file, "bitrate": bitrate}]
+
+    for output in outputs:
+        if output["bitrate"] == AUTO:
+            if profile is None:
+                profile = choose_profile(chapters)
+            output["bitrate"] = profile["bitrate"]
+            # Settings a rendition gives explicitly win over the picked ones
+            for key in ("channels", "sample_rate"):
+                if output.get(key) is None:
+                    output[key] = profile[key]
+
+    total_sec = sum(ch["duration"] for ch in chapters)
+    entries = [] if merge else chapter_entries(chapters)
+    report = {
+        "title": title,
+        "author": author,
+        "inputs": len(chapters),
+        "chapters": len(entries),
+        "duration": total_sec,
+        "outputs": outputs,
+        "profile": profile,
+        "ok": True,
+    }
+
+    def remove_outputs():
+        for output in outputs:
+            if os.path.exists(output["path"]):
+                os.remove(output["path"])
+
+    workspace = tempfile.TemporaryDirectory(prefix="m4b-", dir=workdir)
+    filelist_path = os.path.join(workspace.name, "filelist.txt")
+    metadata_path = os.path.join(workspace.name, "metadata.txt")
+    cover_temp = os.path.join(workspace.name, "temp_cover.jpg")
+
+    try:
+        write_filelist(chapters, filelist_path)
+
+        cover = None
+        if cover_path:
+            cover = cover_temp
+            run_quiet(build_cover_command(cover_path, cover_temp))
+
+        if not merge:
+            write_ffmetadata(entries, metadata_path)
+
+        if layout == RESERVE:
+            cover_size = os.path.getsize(cover) if cover else 0
+            for output in outputs:
+                output["moov_size"] = estimate_moov_size(
+                    total_sec, output.get("sample_rate"),
+                    [e["title"] for e in entries], cover_size, (title, author)
+                )
+
+        def encode(layout):
+            cmd = build_convert_command(
+                filelist_path, outputs, title, author,
+                metadata_path=None if merge else metadata_path,
+                cover_path=cover, layout=layout
+            )
+            run_ffmpeg(cmd, total_sec, on_progress, cancel_event)
+
+        started = time.monotonic()
+        wasted = 0
+        try:
+            try:
+                encode(layout)
+            except subprocess.CalledProcessError as e:
+                if layout != RESERVE or not is_moov_overflow(e):
+                    raise
+                # The reserved space was too small; pay for the rewrite instead
+                wasted = sum(os.path.getsize(o["path"]) for o in outputs if os.path.exists(o["path"]))
+                layout = FASTSTART
+                encode(layout)
+        except ConversionCancelled:
+            remove_outputs()
+            raise
+        if on_progress:
+            on_progress(100.0)
+        report["encode_time"] = time.monotonic() - started
+        report["layout"] = layout
+        for output in outputs:
+            output["size"] = os.path.getsize(output["path"])
+            output["bytes_written"] = bytes_written(layout, output["size"])
+        report["bytes_written"] = wasted + sum(o["bytes_written"] for o in outputs)
+    finally:
+        workspace.cleanup()
+
+    try:
+        if cancel_event is not None and cancel_event.is_set():
+            raise ConversionCancelled()
+
+        if verify:
+            from .verify import verify_m4b
+
+            for output in outputs:
+                output["verify"] = verify_m4b(
+                    output["path"], total_sec, entries, title, author,
+                    expect_cover=bool(cover_path), cancel_event=cancel_event
+                )
+                report["ok"] = report["ok"] and output["verify"]["ok"]
+    except ConversionCancelled:
+        remove_outputs()
+        raise
+    return report
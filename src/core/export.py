@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+
+from .chapters import probed_chapter_entries
+from .probe import probe
+from .runner import run_quiet
+
+
+def safe_filename(name):
+    """Replace characters that aren't allowed in file names."""
+    return re.sub(r'[\\/:*?"<>|]+', "_", name).strip() or "Chapter"
+
+
+def build_export_command(src, entry, index, total, out_file, book_title, has_cover, mp3_bitrate=None):
+    """
+    Build the ffmpeg command that cuts one chapter out of an M4B.
+
+    Without mp3_bitrate the audio is stream-copied, so nothing is decoded;
+    the cut lands on the AAC frame nearest the chapter boundary.
+    """
+    start = entry["start"] / 1000
+    length = (entry["end"] - entry["start"]) / 1000
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-ss", f"{start:.3f}",
+        "-i", src,
+        "-t", f"{length:.3f}",
+        "-map", "0:a:0",
+        "-map_metadata", "0",
+        "-map_chapters", "-1"
+    ]
+    if mp3_bitrate:
+        cmd += ["-c:a", "libmp3lame", "-b:a", mp3_bitrate, "-id3v2_version", "3"]
+    else:
+        cmd += ["-c:a", "copy"]
+    if has_cover:
+        cmd += [
+            "-map", "0:v:0",
+            "-c:v", "copy",
+            "-disposition:v", "attached_pic"
+        ]
+    cmd += [
+        "-metadata", f"title={entry['title']}",
+        "-metadata", f"album={book_title}",
+        "-metadata", f"track={index}/{total}",
+        out_file
+    ]
+    return cmd
+
+
+def export_chapters(src, out_dir, mp3_bitrate=None, workers=None):
+    """
+    Split an M4B into one file per chapter.
+
+    Chapters are cut in parallel. Each part keeps the book's tags and
+    cover, with the chapter as its title and its position as the track
+    number. Parts are .m4a (stream copy) or .mp3 when mp3_bitrate is set.
+    Returns the list of files written.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    info = probe(src)
+    entries = probed_chapter_entries(info)
+    if not entries:
+        raise RuntimeError(f"{os.path.basename(src)} has no chapters")
+
+    tags = {k.lower(): v for k, v in info.get("format", {}).get("tags", {}).items()}
+    book_title = tags.get("title") or os.path.splitext(os.path.basename(src))[0]
+    has_cover = any(
+        s.get("codec_type") == "video" and s.get("disposition", {}).get("attached_pic")
+        for s in info.get("streams", [])
+    )
+
+    os.makedirs(out_dir, exist_ok=True)
+    ext = ".mp3" if mp3_bitrate else ".m4a"
+    total = len(entries)
+    width = len(str(total))
+    jobs = []
+    for i, entry in enumerate(entries, start=1):
+        name = f"{i:0{max(2, width)}d} - {safe_filename(entry['title'] or f'Chapter {i}')}{ext}"
+        out_file = os.path.join(out_dir, name)
+        jobs.append((out_file, build_export_command(
+            src, entry, i, total, out_file, book_title, has_cover, mp3_bitrate
+        )))
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        list(pool.map(lambda job: run_quiet(job[1]), jobs))
+    return [out_file for out_file, _ in jobs]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Split an M4B into one file per chapter.")
+    parser.add_argument("m4b")
+    parser.add_argument("--out", help="Output folder (default: next to the book, named after it)")
+    parser.add_argument("--mp3", metavar="BITRATE", help="Re-encode the parts to MP3, e.g. 128k")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    out_dir = args.out or os.path.splitext(args.m4b)[0]
+    try:
+        files = export_chapters(args.m4b, out_dir, args.mp3, args.workers)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(f"Exported {len(files)} chapters to {os.path.abspath(out_dir)}")
+
+
+if __name__ == "__main__":
+    main()
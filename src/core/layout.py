@@ -0,0 +1,52 @@
+import math
+
+# How the moov atom (the index of the file) is placed in the output
+PLAIN = "plain"          # moov at the end; not streaming-friendly
+FASTSTART = "faststart"  # moov moved to the front by rewriting the whole file
+RESERVE = "reserve"      # space for moov reserved at the front, filled in at the end
+
+AAC_FRAME_SAMPLES = 1024
+# Upper bound when the output sample rate isn't known in advance
+MAX_SAMPLE_RATE = 48000
+
+
+def estimate_moov_size(duration, sample_rate=None, chapters=(), cover_size=0, tags=()):
+    """
+    Bytes to reserve at the front of the file for its moov atom.
+
+    The sample table dominates: 4 bytes per AAC frame in stsz, plus chunk
+    offsets (ffmpeg groups contiguous frames into chunks of up to 1 MB, so
+    one offset per 40 frames is a generous bound). Chapter titles, tags
+    and the cover, which ffmpeg stores in moov as covr, come on top.
+    A 20% margin is added, since ffmpeg fails the write if the estimate
+    is too small.
+    """
+    frames = math.ceil(duration * (sample_rate or MAX_SAMPLE_RATE) / AAC_FRAME_SAMPLES)
+    size = 64 * 1024
+    size += 4 * frames
+    size += 8 * (frames // 40 + 64)
+    size += sum(256 + 2 * len(title.encode("utf-8")) for title in chapters)
+    size += sum(64 + len(str(value).encode("utf-8")) for value in tags)
+    if cover_size:
+        size += cover_size + 4096
+    size = int(size * 1.2)
+    return (size + 4095) // 4096 * 4096
+
+
+def layout_args(layout, moov_size=None):
+    """ffmpeg output options for the given layout."""
+    if layout == FASTSTART:
+        return ["-movflags", "+faststart"]
+    if layout == RESERVE:
+        return ["-moov_size", str(moov_size)]
+    return []
+
+
+def is_moov_overflow(error):
+    """Whether an ffmpeg failure was the reserved moov space running out."""
+    return "moov_size is too small" in (error.stderr or "")
+
+
+def bytes_written(layout, size):
+    """Bytes an encode wrote to disk: faststart writes the file twice."""
+    return 2 * size if layout == FASTSTART else size
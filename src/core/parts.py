@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+
+from .convert import convert_book, rendition_path
+from .profile import AUTO, choose_profile
+from .runner import ConversionCancelled
+
+# Plan against a little less than the size cap, for the container, tags and cover
+SIZE_MARGIN = 0.97
+
+
+def part_path(out_file, index):
+    """Output path for one part, e.g. Book.m4b -> Book_Part_2.m4b."""
+    root, ext = os.path.splitext(out_file)
+    return f"{root}_Part_{index}{ext}"
+
+
+def part_title(title, index, count):
+    return f"{title} (Part {index} of {count})"
+
+
+def bitrate_kbps(bitrate):
+    """'128k' -> 128.0"""
+    bitrate = str(bitrate).lower()
+    if bitrate.endswith("k"):
+        return float(bitrate[:-1])
+    return float(bitrate) / 1000
+
+
+def greedy_parts(durations, max_seconds):
+    """Fill each part with whole chapters until the next one would overflow it."""
+    parts, current, length = [], [], 0.0
+    for i, duration in enumerate(durations):
+        if current and length + duration > max_seconds:
+            parts.append(current)
+            current, length = [], 0.0
+        current.append(i)
+        length += duration
+    if current:
+        parts.append(current)
+    return parts
+
+
+def balanced_parts(durations, count, max_seconds):
+    """
+    Split into count parts of about equal length, at the chapter boundaries
+    closest to the ideal cut points. Returns None if a part would overflow.
+    """
+    total = sum(durations)
+    parts, current, elapsed = [], [], 0.0
+    for i, duration in enumerate(durations):
+        target = total * (len(parts) + 1) / count
+        # Cut before this chapter if its midpoint lies past the target
+        if current and len(parts) < count - 1 and elapsed + duration / 2 > target:
+            parts.append(current)
+            current = []
+        current.append(i)
+        elapsed += duration
+    parts.append(current)
+    for part in parts:
+        if len(part) > 1 and sum(durations[i] for i in part) > max_seconds:
+            return None
+    return parts
+
+
+def plan_parts(chapters, max_seconds=None, max_bytes=None, kbps=128):
+    """
+    Group chapters into parts no longer than max_seconds and (at kbps)
+    no larger than max_bytes, cutting only between chapters.
+
+    Uses as few parts as a greedy fill needs, then evens out their
+    lengths so they take about as long to encode. A single chapter over
+    the limits becomes a part of its own. Returns lists of chapter
+    indices.
+    """
+    limit = float("inf")
+    if max_seconds:
+        limit = min(limit, max_seconds)
+    if max_bytes:
+        limit = min(limit, max_bytes * SIZE_MARGIN / (kbps * 1000 / 8))
+
+    durations = [ch["duration"] for ch in chapters]
+    greedy = greedy_parts(durations, limit)
+    if len(greedy) < 2:
+        return greedy
+    return balanced_parts(durations, len(greedy), limit) or greedy
+
+
+def convert_parts(chapters, out_file, title, author, max_seconds=None, max_bytes=None,
+                  workers=None, on_progress=None, cancel_event=None, **options):
+    """
+    Encode a book as several M4B files that each stay under the caps.
+
+    Parts are cut at chapter boundaries (see plan_parts) and encoded
+    concurrently with convert_book, each with its own chapter table
+    starting at zero, "Title (Part i of n)" as title and the shared
+    cover; options are passed on to convert_book. An "auto" bitrate is
+    resolved once for the whole book so all parts sound the same.
+
+    on_progress is called from the calling thread with the overall
+    percentage. If one part fails or is cancelled the others are stopped
+    and every part written is removed.
+
+    Returns a run report like convert_book's, with report["parts"]
+    holding the report of each part. Without caps, or if the book fits
+    in one part, this is just convert_book.
+    """
+    from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+    if not (max_seconds or max_bytes):
+        return convert_book(chapters, out_file, title, author, on_progress=on_progress,
+                            cancel_event=cancel_event, **options)
+
+    bitrates = [r["bitrate"] for r in options.get("renditions") or []] or [options.get("bitrate", "128k")]
+    profile = options.pop("profile", None)
+    if AUTO in bitrates:
+        profile = profile or choose_profile(chapters)
+        bitrates = [profile["bitrate"] if b == AUTO else b for b in bitrates]
+    kbps = max(bitrate_kbps(b) for b in bitrates)
+
+    plan = plan_parts(chapters, max_seconds, max_bytes, kbps)
+    if len(plan) < 2:
+        return convert_book(chapters, out_file, title, author, on_progress=on_progress,
+                            cancel_event=cancel_event, profile=profile, **options)
+
+    durations = [sum(chapters[i]["duration"] for i in part) for part in plan]
+    progress = [0.0] * len(plan)
+    stop = threading.Event()
+
+    def encode(k):
+        def part_progress(pct):
+            progress[k] = max(0.0, min(pct, 100.0))
+
+        return convert_book(
+            [chapters[i] for i in plan[k]], part_path(out_file, k + 1),
+            part_title(title, k + 1, len(plan)), author,
+            on_progress=part_progress, cancel_event=stop, profile=profile, **options
+        )
+
+    def report_progress():
+        if on_progress:
+            overall = sum(p * d for p, d in zip(progress, durations)) / (sum(durations) or 1)
+            on_progress(max(0.0, min(overall, 99.9)))
+
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=workers or min(len(plan), os.cpu_count() or 1))
+    try:
+        futures = [pool.submit(encode, k) for k in range(len(plan))]
+        pending = futures
+        while pending:
+            done, pending = wait(pending, timeout=0.25, return_when=FIRST_EXCEPTION)
+            report_progress()
+            if (cancel_event is not None and cancel_event.is_set()) or any(f.exception() for f in done):
+                stop.set()
+        wait(futures)
+    finally:
+        pool.shutdown(wait=True)
+
+    if stop.is_set():
+        for k in range(len(plan)):
+            path = part_path(out_file, k + 1)
+            renditions = options.get("renditions")
+            for output in [rendition_path(path, r["name"]) for r in renditions] if renditions else [path]:
+                if os.path.exists(output):
+                    os.remove(output)
+        errors = [f.exception() for f in futures
+                  if f.exception() and not isinstance(f.exception(), ConversionCancelled)]
+        if errors:
+            raise errors[0]
+        raise ConversionCancelled()
+
+    if on_progress:
+        on_progress(100.0)
+
+    parts = [f.result() for f in futures]
+    layouts = sorted({r["layout"] for r in parts})
+    return {
+        "title": title,
+        "author": author,
+        "inputs": len(chapters),
+        "chapters": sum(r["chapters"] for r in parts),
+        "duration": sum(r["duration"] for r in parts),
+        "outputs": [o for r in parts for o in r["outputs"]],
+        "profile": profile,
+        "layout": ", ".join(layouts),
+        "bytes_written": sum(r["bytes_written"] for r in parts),
+        "encode_time": time.monotonic() - started,
+        "parts": parts,
+        "ok": all(r["ok"] for r in parts),
+    }
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+
+
+def probe(path):
+    """Return ffprobe's format, streams and chapters for a file."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_format", "-show_streams", "-show_chapters",
+        "-of", "json", path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed on {os.path.basename(path)}: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+def get_duration(path):
+    """Get audio duration in seconds using ffprobe."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "json", path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Couldn't get duration for {os.path.basename(path)}")
+    data = json.loads(result.stdout)
+    return float(data["format"]["duration"])
+
+
+def get_durations(paths, workers=None):
+    """Probe the durations of many files in parallel, keeping their order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=workers or min(16, (os.cpu_count() or 1) * 2)) as pool:
+        return list(pool.map(get_duration, paths))
@@ -0,0 +1,141 @@
+import os
+import subprocess
+
+from .probe import probe
+
+AUTO = "auto"
+
+# AAC-LC bitrates we pick from, in kbit/s
+BITRATE_LADDER = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192)
+MAX_BITRATE = {1: 64, 2: 128}
+MIN_BITRATE = {1: 32, 2: 48}
+# AAC needs roughly this fraction of an MP3's bitrate for the same quality
+AAC_EFFICIENCY = 0.75
+SAMPLE_RATES = (22050, 24000, 32000, 44100, 48000)
+
+# Stereo sources whose channels correlate at least this well are encoded as mono
+MONO_CORRELATION = 0.98
+SAMPLE_FILES = 6
+SAMPLE_SECONDS = 5
+ANALYSIS_RATE = 8000
+
+
+def source_info(path):
+    """Return (channels, sample_rate, bitrate in bit/s) of a file's first audio stream."""
+    info = probe(path)
+    stream = next(s for s in info["streams"] if s.get("codec_type") == "audio")
+    bitrate = stream.get("bit_rate") or info["format"].get("bit_rate") or 0
+    return int(stream.get("channels", 2)), int(stream.get("sample_rate", 44100)), int(bitrate)
+
+
+def decode_stereo_slice(path, start, length):
+    """Decode a short slice as interleaved 16-bit stereo PCM at ANALYSIS_RATE."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-ss", f"{start:.3f}", "-t", f"{length:.3f}",
+        "-i", path,
+        "-map", "0:a:0", "-ac", "2", "-ar", str(ANALYSIS_RATE),
+        "-f", "s16le", "-"
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return result.stdout
+
+
+def channel_correlation(chapters):
+    """
+    Correlation between left and right over a sample of the decoded audio.
+
+    A few seconds from the middle of up to SAMPLE_FILES inputs, spread
+    over the book, are decoded in parallel at a low rate. Returns None if
+    the sample is silent.
+    """
+    import numpy as np
+    from concurrent.futures import ThreadPoolExecutor
+
+    step = max(1, len(chapters) // SAMPLE_FILES)
+    picks = chapters[::step][:SAMPLE_FILES]
+    with ThreadPoolExecutor(max_workers=len(picks)) as pool:
+        slices = list(pool.map(
+            lambda ch: decode_stereo_slice(
+                ch["path"], max(0.0, ch["duration"] / 2 - SAMPLE_SECONDS / 2), SAMPLE_SECONDS
+            ),
+            picks
+        ))
+
+    data = b"".join(s[:len(s) - len(s) % 4] for s in slices)
+    samples = np.frombuffer(data, np.int16).reshape(-1, 2).astype(np.float32)
+    if len(samples) == 0:
+        return None
+    left = samples[:, 0] - samples[:, 0].mean()
+    right = samples[:, 1] - samples[:, 1].mean()
+    denom = np.sqrt(np.dot(left, left) * np.dot(right, right))
+    if denom == 0:
+        return None
+    return float(np.dot(left, right) / denom)
+
+
+def pick_bitrate(kbps, channels):
+    target = min(max(kbps, MIN_BITRATE[channels]), MAX_BITRATE[channels])
+    return next((b for b in BITRATE_LADDER if b >= target), BITRATE_LADDER[-1])
+
+
+def pick_sample_rate(source_rate, bitrate_kbps, channels):
+    per_channel = bitrate_kbps / channels
+    if per_channel <= 32:
+        cap = 24000
+    elif per_channel <= 48:
+        cap = 32000
+    else:
+        cap = 48000
+    cap = min(cap, source_rate)
+    return max((r for r in SAMPLE_RATES if r <= cap), default=source_rate)
+
+
+def choose_profile(chapters):
+    """
+    Pick channels, sample rate and bitrate the sources justify.
+
+    Mono sources stay mono; stereo sources are downmixed when their
+    channels are near-identical. The bitrate never exceeds what the
+    richest source carries (scaled for AAC's efficiency over MP3).
+    Returns a dict of the decisions and the data they were based on,
+    for the run report.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=min(16, (os.cpu_count() or 1) * 2)) as pool:
+        infos = list(pool.map(source_info, [ch["path"] for ch in chapters]))
+
+    src_channels = max(i[0] for i in infos)
+    src_rate = max(i[1] for i in infos)
+    src_kbps = max(i[2] for i in infos) / 1000 or MAX_BITRATE[2]
+
+    correlation = None
+    if src_channels == 1:
+        channels = 1
+        reason = "source is mono"
+    else:
+        correlation = channel_correlation(chapters)
+        if correlation is None or correlation >= MONO_CORRELATION:
+            channels = 1
+            reason = "stereo channels are near-identical" if correlation is not None else "sampled audio is silent"
+        else:
+            channels = 2
+            reason = "source has real stereo content"
+
+    kbps = src_kbps * AAC_EFFICIENCY
+    bitrate = pick_bitrate(kbps, channels)
+    sample_rate = pick_sample_rate(src_rate, bitrate, channels)
+
+    return {
+        "channels": channels,
+        "sample_rate": sample_rate,
+        "bitrate": f"{bitrate}k",
+        "reason": reason,
+        "source": {
+            "channels": src_channels,
+            "sample_rate": src_rate,
+            "bitrate": f"{int(src_kbps)}k",
+            "correlation": correlation,
+        },
+    }
@@ -0,0 +1,263 @@
+import os
+import subprocess
+
+ANALYSIS_RATE = 8000
+CLIP_SECONDS = 120       # Head and tail of each input that are searched
+FRAME_SIZE = 1024
+HOP = 256                # 32 ms between fingerprints
+BANDS = 33               # 33 bands give 32 bits per fingerprint
+LOW_HZ, HIGH_HZ = 300, 3000
+
+SILENCE_RMS = 100.0      # Frames quieter than about -50 dBFS get no fingerprint
+COMMON_FRACTION = 0.9    # Fingerprints in nearly every clip (hum, tones) say nothing
+MAX_PER_CLIP = 4         # Repeats of one fingerprint within a clip that get a vote
+MIN_VOTES = 8
+MATCH_BER = 0.3          # Bit error rate below which two frames are the same audio
+SMOOTH_FRAMES = 31
+MIN_REPEAT_SECONDS = 20
+EDGE_SLACK = 5.0         # How far from the start/end a repeat may begin/end to be trimmed
+
+
+def decode_clip(path, part):
+    """Decode the first or last CLIP_SECONDS of a file as mono float32 at ANALYSIS_RATE."""
+    import numpy as np
+
+    cmd = ["ffmpeg", "-nostdin", "-v", "error"]
+    if part == "tail":
+        cmd += ["-sseof", f"-{CLIP_SECONDS}"]
+    cmd += [
+        "-i", path, "-t", str(CLIP_SECONDS),
+        "-map", "0:a:0", "-ac", "1", "-ar", str(ANALYSIS_RATE),
+        "-f", "s16le", "-"
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    data = result.stdout[:len(result.stdout) - len(result.stdout) % 2]
+    return np.frombuffer(data, np.int16).astype(np.float32)
+
+
+def fingerprint(samples):
+    """
+    32-bit spectral fingerprints, one per HOP samples.
+
+    Each bit is the sign of the change, from one frame to the next, of
+    the energy difference between two adjacent log-spaced bands. Small
+    level, EQ and codec differences leave most bits unchanged.
+
+    Returns the fingerprints and a mask of the ones worth matching on:
+    near-silent frames and flat spectra (all bits equal) are left out.
+    """
+    import numpy as np
+
+    if len(samples) < FRAME_SIZE + HOP:
+        return np.empty(0, np.uint32), np.empty(0, bool)
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP]
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(FRAME_SIZE), axis=1)) ** 2
+    freqs = np.fft.rfftfreq(FRAME_SIZE, 1 / ANALYSIS_RATE)
+    edges = np.searchsorted(freqs, np.geomspace(LOW_HZ, HIGH_HZ, BANDS + 1))
+    energy = np.add.reduceat(spectrum[:, :edges[-1]], edges[:-1], axis=1)
+    diff = energy[:, :-1] - energy[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    prints = np.packbits(bits, axis=1, bitorder="little").view("<u4").ravel()
+    rms = np.sqrt(np.mean(frames[1:] ** 2, axis=1))
+    usable = (rms >= SILENCE_RMS) & (prints != 0) & (prints != 0xFFFFFFFF)
+    return prints, usable
+
+
+def bit_errors(a, b):
+    """Number of differing bits between two uint32 arrays, element-wise."""
+    import numpy as np
+
+    return np.unpackbits((a ^ b).view(np.uint8).reshape(-1, 4), axis=1).sum(axis=1)
+
+
+def longest_match(fa, fb, offset):
+    """
+    Longest run where fa[i] and fb[i + offset] are the same audio.
+
+    Returns (first, last) frame indices into fa, or None.
+    """
+    import numpy as np
+
+    lo = max(0, -offset)
+    hi = min(len(fa), len(fb) - offset)
+    if hi - lo < SMOOTH_FRAMES:
+        return None
+    errors = bit_errors(fa[lo:hi], fb[lo + offset:hi + offset]) / 32.0
+    smooth = np.convolve(errors, np.ones(SMOOTH_FRAMES) / SMOOTH_FRAMES, mode="same")
+    good = np.concatenate(([False], smooth < MATCH_BER, [False]))
+    changes = np.flatnonzero(np.diff(good.astype(np.int8)))
+    if len(changes) == 0:
+        return None
+    starts, ends = changes[::2], changes[1::2]
+    best = int(np.argmax(ends - starts))
+    return lo + int(starts[best]), lo + int(ends[best])
+
+
+def best_offsets(prints, usable, clips):
+    """
+    Propose an alignment for every pair of clips that share fingerprints.
+
+    An inverted index from fingerprint to (clip, frame) is built by
+    sorting. Fingerprints found in nearly every clip are dropped, and so
+    are the ones a single clip repeats more than MAX_PER_CLIP times. Each
+    remaining posting votes for its frame offset against the earliest
+    chapter holding the same fingerprint in the same part (head or tail),
+    so memory grows linearly with the number of inputs. Returns
+    {(a, b): offset} for the best offset of each pair of clips with at
+    least MIN_VOTES votes.
+    """
+    import numpy as np
+
+    values = np.concatenate([p[u] for p, u in zip(prints, usable)])
+    owners = np.concatenate([np.full(int(u.sum()), i, np.int64) for i, u in enumerate(usable)])
+    frames = np.concatenate([np.flatnonzero(u) for u in usable]).astype(np.int64)
+    if len(values) == 0:
+        return {}
+
+    # Sort by fingerprint, then clip, then frame, and keep the first few per clip
+    order = np.lexsort((frames, owners, values))
+    values, owners, frames = values[order], owners[order], frames[order]
+    new_group = np.concatenate(([True], (values[1:] != values[:-1]) | (owners[1:] != owners[:-1])))
+    group_start = np.flatnonzero(new_group)
+    rank = np.arange(len(values)) - group_start[np.cumsum(new_group) - 1]
+    keep = rank < MAX_PER_CLIP
+    values, owners, frames, new_group = values[keep], owners[keep], frames[keep], new_group[keep]
+
+    # Runs of one fingerprint, with the number of distinct clips in each
+    run_starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    run_sizes = np.diff(np.append(run_starts, len(values)))
+    run_clips = np.add.reduceat(new_group.astype(np.int64), run_starts)
+    shared = (run_clips >= 2) & (run_clips <= COMMON_FRACTION * len(clips))
+    if not shared.any():
+        return {}
+
+    # Postings of shared fingerprints, regrouped by (fingerprint, part) in chapter order
+    keep = np.repeat(shared, run_sizes)
+    values, owners, frames = values[keep], owners[keep], frames[keep]
+    chapter = np.array([c["chapter"] for c in clips])
+    part = np.array([c["part"] == "tail" for c in clips])
+    order = np.lexsort((frames, chapter[owners], part[owners], values))
+    values, owners, frames = values[order], owners[order], frames[order]
+    new_group = np.concatenate(([True], (values[1:] != values[:-1])
+                                | (part[owners][1:] != part[owners][:-1])))
+    group_id = np.cumsum(new_group) - 1
+    group_start = np.flatnonzero(new_group)
+
+    # Each later posting votes only against the earliest clip holding the
+    # fingerprint (the occurrence that is kept), so votes grow linearly
+    # with the number of inputs rather than with its square
+    earliest = owners == owners[group_start][group_id]
+    earliest_count = np.bincount(group_id, weights=earliest).astype(np.int64)
+    later = np.flatnonzero(~earliest)
+    counts = earliest_count[group_id[later]]
+    b_idx = np.repeat(later, counts)
+    firsts = np.repeat(group_start[group_id[later]], counts)
+    a_idx = firsts + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a, b = owners[a_idx], owners[b_idx]
+    offsets = frames[b_idx] - frames[a_idx]
+    if len(a) == 0:
+        return {}
+
+    span = int(frames.max()) + 1
+    keys = (a * len(clips) + b) * (2 * span + 1) + offsets + span
+    keys, votes = np.unique(keys, return_counts=True)
+    pairs, offsets = keys // (2 * span + 1), keys % (2 * span + 1) - span
+
+    # The most voted offset of each pair: sort by votes within pair, take the last
+    order = np.lexsort((votes, pairs))
+    last = np.append(pairs[order][1:] != pairs[order][:-1], True)
+    best = order[last]
+    best = best[votes[best] >= MIN_VOTES]
+    return {
+        (int(p // len(clips)), int(p % len(clips))): int(o)
+        for p, o in zip(pairs[best], offsets[best])
+    }
+
+
+def find_repeats(chapters, workers=None):
+    """
+    Find intros and outros that repeat across inputs.
+
+    The head and tail of every input are fingerprinted in parallel,
+    alignments between clips of different inputs are proposed through an
+    inverted index (see best_offsets), each alignment is checked frame by
+    frame, and runs of at least MIN_REPEAT_SECONDS that start (intro) or
+    end (outro) within EDGE_SLACK of the file's edge are kept. Only the
+    later input of a matching pair is reported, so the first occurrence
+    stays in the book.
+
+    Returns a list of dicts with "chapter" (index into chapters), "part"
+    ("head" or "tail"), "start" and "end" (seconds into the file) and
+    "matches" (index of the earlier chapter with the same audio).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    clips = []
+    for k, ch in enumerate(chapters):
+        file_duration = ch.get("file_duration", ch["duration"])
+        clips.append({"chapter": k, "part": "head", "path": ch["path"],
+                      "offset": 0.0, "file_duration": file_duration})
+        clips.append({"chapter": k, "part": "tail", "path": ch["path"],
+                      "offset": max(file_duration - CLIP_SECONDS, 0.0),
+                      "file_duration": file_duration})
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        results = list(pool.map(lambda c: fingerprint(decode_clip(c["path"], c["part"])), clips))
+    prints = [r[0] for r in results]
+    usable = [r[1] for r in results]
+
+    frame_seconds = HOP / ANALYSIS_RATE
+    found = {}
+    for (a, b), offset in best_offsets(prints, usable, clips).items():
+        match = longest_match(prints[a], prints[b], offset)
+        if match is None:
+            continue
+        first, last = match
+        if (last - first) * frame_seconds < MIN_REPEAT_SECONDS:
+            continue
+        clip = clips[b]
+        repeat = {
+            "chapter": clip["chapter"],
+            "part": clip["part"],
+            "start": clip["offset"] + (first + offset) * frame_seconds,
+            "end": clip["offset"] + (last + offset) * frame_seconds,
+            "matches": clips[a]["chapter"],
+        }
+        # Only intros and outros, i.e. repeats at the edges of a file, can be trimmed
+        if clip["part"] == "head" and repeat["start"] > EDGE_SLACK:
+            continue
+        if clip["part"] == "tail" and repeat["end"] < clip["file_duration"] - EDGE_SLACK:
+            continue
+        key = (clip["chapter"], clip["part"])
+        if key not in found or repeat["end"] - repeat["start"] > found[key]["end"] - found[key]["start"]:
+            found[key] = repeat
+
+    return [found[key] for key in sorted(found)]
+
+
+def apply_trims(chapters, repeats):
+    """
+    Return copies of chapters with the repeats from find_repeats cut off.
+
+    Trimmed chapters get "inpoint" and "outpoint" (seconds, used in the
+    concat list) and a shorter "duration", so chapter offsets follow;
+    "file_duration" keeps the untrimmed length.
+    """
+    trimmed = []
+    for k, ch in enumerate(chapters):
+        ch = dict(ch)
+        file_duration = ch.get("file_duration", ch["duration"])
+        inpoint = ch.get("inpoint", 0.0)
+        outpoint = ch.get("outpoint", file_duration)
+        for r in repeats:
+            if r["chapter"] != k:
+                continue
+            if r["part"] == "head":
+                inpoint = max(inpoint, r["end"])
+            else:
+                outpoint = min(outpoint, r["start"])
+        if outpoint - inpoint >= 1.0 and (inpoint > 0 or outpoint < file_duration):
+            ch.update(file_duration=file_duration, inpoint=inpoint, outpoint=outpoint,
+                      duration=outpoint - inpoint)
+        trimmed.append(ch)
+    return trimmed
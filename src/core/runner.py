@@ -0,0 +1,69 @@
+import subprocess
+from collections import deque
+
+
+def time_to_seconds(time_str: str) -> float:
+    parts = time_str.split(":")
+    if len(parts) == 3:
+        h, m, s = parts
+        return float(h)*3600 + float(m)*60 + float(s)
+    elif len(parts) == 2:
+        m, s = parts
+        return float(m)*60 + float(s)
+    return float(parts[0])
+
+
+class ConversionCancelled(Exception):
+    """Raised when a conversion is stopped through its cancel event."""
+
+
+def run_ffmpeg(cmd, total_sec=0, on_progress=None, cancel_event=None):
+    """
+    Run an ffmpeg command, reporting progress as a percentage.
+
+    on_progress is called with a float in [0, 100] each time ffmpeg prints
+    a time= status line; negative or unparsable times (ffmpeg prints a
+    bogus negative one at the start of concat encodes) are skipped. If
+    cancel_event (a threading.Event) gets set, ffmpeg is stopped and
+    ConversionCancelled is raised. Raises CalledProcessError (with the
+    tail of ffmpeg's log as stderr) if ffmpeg fails.
+    """
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               universal_newlines=True)
+    tail = deque(maxlen=20)
+
+    try:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ConversionCancelled()
+            line = process.stderr.readline()
+            if not line and process.poll() is not None:
+                break
+            if "time=" in line:
+                if on_progress:
+                    time_str = line.split("time=")[1].split()[0]
+                    try:
+                        current_sec = time_to_seconds(time_str)
+                    except ValueError:
+                        continue
+                    if current_sec < 0:
+                        continue
+                    pct = (current_sec / total_sec) * 100 if total_sec > 0 else 0
+                    on_progress(max(0.0, min(pct, 100.0)))
+            elif line.strip():
+                tail.append(line)
+    except BaseException:
+        # Never leave ffmpeg running unsupervised, whether cancelled or a callback failed
+        if process.poll() is None:
+            process.terminate()
+        process.wait()
+        raise
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stderr="".join(tail))
+
+
+def run_quiet(cmd):
+    """Run a short ffmpeg command, discarding its output."""
+    subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
@@ -0,0 +1,196 @@
+import mmap
+import os
+import struct
+import subprocess
+import threading
+from array import array
+
+from .cache import cache_dir, file_key
+
+# Keep the byte offset of every STRIDE-th frame (~0.4 s at 44.1 kHz)
+STRIDE = 16
+# Frames decoded before the requested time so the bit reservoir is filled
+PREROLL_FRAMES = 4
+
+PCM_RATE = 44100
+PCM_CHANNELS = 2
+
+_HEADER = struct.Struct("<4sIIII")
+_MAGIC = b"M4SI"
+
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_memory = {}
+_lock = threading.Lock()
+
+
+def parse_frame_header(b0, b1, b2):
+    """Return (frame_length, sample_rate, samples_per_frame) or None if not an MPEG audio header."""
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 3
+    layer_bits = (b1 >> 1) & 3
+    bitrate_idx = b2 >> 4
+    rate_idx = (b2 >> 2) & 3
+    if version_bits == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    version = 1 if version_bits == 3 else 2
+    layer = 4 - layer_bits
+    bitrate = _BITRATES[(version, layer)][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][rate_idx]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, sample_rate, 384
+    if layer == 3 and version == 2:
+        return 72 * bitrate // sample_rate + padding, sample_rate, 576
+    return 144 * bitrate // sample_rate + padding, sample_rate, 1152
+
+
+class SeekIndex:
+    """Byte offsets of every STRIDE-th MPEG audio frame of one file."""
+
+    def __init__(self, sample_rate, frame_samples, frame_count, offsets, stride=STRIDE):
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.frame_count = frame_count
+        self.offsets = offsets
+        self.stride = stride
+
+    @property
+    def duration(self):
+        return self.frame_count * self.frame_samples / self.sample_rate
+
+    def frame_at(self, seconds):
+        frame = int(seconds * self.sample_rate / self.frame_samples)
+        return min(max(frame, 0), self.frame_count)
+
+    def locate(self, start, end):
+        """
+        Byte range covering [start, end) seconds, with some pre-roll.
+
+        Returns (first_byte, last_byte, seconds from first_byte to start);
+        last_byte is None when the range runs to the end of the file.
+        """
+        first = max(self.frame_at(start) - PREROLL_FRAMES, 0) // self.stride
+        last = self.frame_at(end) // self.stride + 1
+        first_time = first * self.stride * self.frame_samples / self.sample_rate
+        last_byte = self.offsets[last] if last < len(self.offsets) else None
+        return self.offsets[first], last_byte, max(start - first_time, 0.0)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.sample_rate, self.frame_samples,
+                                 self.stride, self.frame_count))
+            self.offsets.tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, sample_rate, frame_samples, stride, frame_count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != _MAGIC:
+                raise ValueError("Not a seek index")
+            offsets = array("Q")
+            offsets.frombytes(f.read())
+        return cls(sample_rate, frame_samples, frame_count, offsets, stride)
+
+
+def scan_mp3(path, stride=STRIDE):
+    """
+    Walk the frame headers of an MP3 and build its seek index.
+
+    Only the 4-byte headers are looked at; frame payloads are skipped by
+    their computed length. A leading Xing/Info frame is not counted, since
+    decoders don't output it.
+    """
+    offsets = array("Q")
+    sample_rate = frame_samples = None
+    count = 0
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = 0
+        if mm[:3] == b"ID3" and size >= 10:
+            tag_size = (mm[6] << 21) | (mm[7] << 14) | (mm[8] << 7) | mm[9]
+            pos = 10 + tag_size + (10 if mm[5] & 0x10 else 0)
+
+        while pos + 4 <= size:
+            header = parse_frame_header(mm[pos], mm[pos + 1], mm[pos + 2])
+            if header is None or header[0] <= 0:
+                pos += 1
+                continue
+            length, rate, samples = header
+            if count == 0:
+                # Guard against false sync: the next frame must line up too
+                nxt = pos + length
+                if nxt + 3 <= size and parse_frame_header(mm[nxt], mm[nxt + 1], mm[nxt + 2]) is None:
+                    pos += 1
+                    continue
+                if sample_rate is None:
+                    sample_rate, frame_samples = rate, samples
+                    if mm.find(b"Xing", pos + 4, pos + 40) != -1 or mm.find(b"Info", pos + 4, pos + 40) != -1:
+                        pos += length
+                        continue
+            if count % stride == 0:
+                offsets.append(pos)
+            count += 1
+            pos += length
+
+    if not count:
+        raise RuntimeError(f"No MPEG audio frames found in {os.path.basename(path)}")
+    return SeekIndex(sample_rate, frame_samples, count, offsets, stride)
+
+
+def get_seek_index(path):
+    """Return the seek index of a file, building and caching it on first use."""
+    key = file_key(path)
+    with _lock:
+        index = _memory.get(key)
+    if index is not None:
+        return index
+
+    cache_path = os.path.join(cache_dir("seek"), f"{key}.idx")
+    try:
+        index = SeekIndex.load(cache_path)
+    except (OSError, ValueError, struct.error):
+        index = scan_mp3(path)
+        tmp_path = f"{cache_path}.{os.getpid()}-{threading.get_ident()}.tmp"
+        index.save(tmp_path)
+        os.replace(tmp_path, cache_path)
+
+    with _lock:
+        _memory[key] = index
+    return index
+
+
+def decode_range(path, start, length):
+    """
+    Decode length seconds from start to 16-bit stereo PCM at PCM_RATE.
+
+    Only the bytes of the frames covering the range are read and piped to
+    ffmpeg, so the cost doesn't depend on where in the file the range is.
+    """
+    index = get_seek_index(path)
+    start = min(max(start, 0.0), index.duration)
+    first_byte, last_byte, skip = index.locate(start, start + length)
+    with open(path, "rb") as f:
+        f.seek(first_byte)
+        data = f.read(-1 if last_byte is None else last_byte - first_byte)
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-f", "mp3", "-i", "pipe:0",
+        "-ss", f"{skip:.3f}", "-t", f"{length:.3f}",
+        "-f", "s16le", "-ac", str(PCM_CHANNELS), "-ar", str(PCM_RATE),
+        "pipe:1"
+    ]
+    result = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"Couldn't decode {os.path.basename(path)}: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
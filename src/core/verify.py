@@ -0,0 +1,184 @@
+import os
+import subprocess
+import sys
+import time
+
+from .chapters import read_ffmetadata_chapters, probed_chapter_entries
+from .probe import probe, get_durations
+from .runner import ConversionCancelled
+
+# Allowed drift between the output and the inputs it was built from.
+# AAC priming/padding adds a few ms per file; truncation is minutes.
+DURATION_TOLERANCE = 2.0        # seconds, or 0.1% of the book if larger
+CHAPTER_TOLERANCE_MS = 500
+
+
+def decode_slice(path, start, length):
+    """Fully decode one time slice of the audio and return any decoder errors."""
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-ss", f"{start:.3f}", "-t", f"{length:.3f}",
+        "-i", path,
+        "-map", "0:a", "-f", "null", "-"
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    errors = [line for line in result.stderr.splitlines() if line.strip()]
+    if result.returncode != 0 and not errors:
+        errors.append(f"ffmpeg exited with code {result.returncode}")
+    return errors
+
+
+def decode_check(path, duration, workers=None, cancel_event=None):
+    """
+    Decode the whole file in parallel time slices.
+
+    The file is cut into a few slices per core so a slow slice doesn't
+    leave the other cores idle; input seeking in MP4 uses the sample
+    table, so each worker starts decoding at its slice right away.
+    cancel_event is checked between slices; setting it drops the slices
+    not yet started and raises ConversionCancelled.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    slices = max(1, min(workers * 2, int(duration // 60) or 1))
+    length = duration / slices
+    problems = []
+
+    def check_slice(start):
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+        return decode_slice(path, start, length)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(i * length, pool.submit(check_slice, i * length)) for i in range(slices)]
+        for start, future in futures:
+            errors = future.result()
+            if cancel_event is not None and cancel_event.is_set():
+                for _, pending in futures:
+                    pending.cancel()
+                raise ConversionCancelled()
+            for err in errors:
+                problems.append(f"Decode error near {format_time(start)}: {err}")
+    return problems
+
+
+def format_time(secs):
+    return f"{int(secs // 3600):02d}:{int((secs % 3600) // 60):02d}:{int(secs % 60):02d}"
+
+
+def verify_m4b(path, expected_duration=None, chapters=None, title=None, author=None,
+               expect_cover=False, decode=True, workers=None, cancel_event=None):
+    """
+    Check that a finished M4B is complete.
+
+    chapters is the list written to the FFMETADATA file (see
+    read_ffmetadata_chapters). Returns a report dict; report["ok"] is False
+    and report["problems"] lists what is wrong if any check failed.
+    Setting cancel_event stops the decode check with ConversionCancelled.
+    """
+    started = time.monotonic()
+    problems = []
+    report = {"path": path, "ok": False, "problems": problems}
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        problems.append("Output file is missing or empty")
+        return report
+
+    try:
+        info = probe(path)
+    except RuntimeError as e:
+        problems.append(str(e))
+        return report
+
+    fmt = info.get("format", {})
+    duration = float(fmt.get("duration", 0))
+    report["duration"] = duration
+    report["size"] = int(fmt.get("size", 0))
+
+    if expected_duration is not None:
+        tolerance = max(DURATION_TOLERANCE, expected_duration * 0.001)
+        report["expected_duration"] = expected_duration
+        if abs(duration - expected_duration) > tolerance:
+            problems.append(
+                f"Duration {duration:.2f}s doesn't match the inputs ({expected_duration:.2f}s)"
+            )
+
+    if chapters is not None:
+        found = probed_chapter_entries(info)
+        report["chapters"] = len(found)
+        if len(found) != len(chapters):
+            problems.append(f"Expected {len(chapters)} chapters, found {len(found)}")
+        else:
+            for i, (want, got) in enumerate(zip(chapters, found)):
+                if abs(got["start"] - want["start"]) > CHAPTER_TOLERANCE_MS:
+                    problems.append(
+                        f"Chapter {i + 1} starts at {got['start']} ms, expected {want['start']} ms"
+                    )
+                if want["title"] and got["title"] != want["title"]:
+                    problems.append(f"Chapter {i + 1} title is '{got['title']}', expected '{want['title']}'")
+
+    tags = {k.lower(): v for k, v in fmt.get("tags", {}).items()}
+    if title is not None and tags.get("title") != title:
+        problems.append(f"Title tag is '{tags.get('title', '')}', expected '{title}'")
+    if author is not None and tags.get("artist") != author:
+        problems.append(f"Artist tag is '{tags.get('artist', '')}', expected '{author}'")
+
+    streams = info.get("streams", [])
+    if not any(s.get("codec_type") == "audio" for s in streams):
+        problems.append("No audio stream")
+    has_cover = any(s.get("disposition", {}).get("attached_pic") for s in streams)
+    report["has_cover"] = has_cover
+    if expect_cover and not has_cover:
+        problems.append("Cover art is missing")
+
+    if decode and duration > 0:
+        problems.extend(decode_check(path, duration, workers, cancel_event))
+
+    report["ok"] = not problems
+    report["elapsed"] = time.monotonic() - started
+    return report
+
+
+def print_report(report):
+    status = "OK" if report["ok"] else "FAILED"
+    print(f"Verification {status}: {report['path']}")
+    if "duration" in report:
+        print(f"  Duration: {format_time(report['duration'])}")
+    if "chapters" in report:
+        print(f"  Chapters: {report['chapters']}")
+    if "elapsed" in report:
+        print(f"  Checked in {report['elapsed']:.1f}s")
+    for problem in report["problems"]:
+        print(f"  - {problem}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verify that a converted M4B is complete.")
+    parser.add_argument("m4b")
+    parser.add_argument("--inputs", nargs="*", help="Source files; their total duration must match")
+    parser.add_argument("--metadata", help="FFMETADATA file the chapters were written from")
+    parser.add_argument("--title")
+    parser.add_argument("--author")
+    parser.add_argument("--cover", action="store_true", help="Require cover art")
+    parser.add_argument("--no-decode", action="store_true", help="Skip the full decode check")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    expected_duration = None
+    if args.inputs:
+        expected_duration = sum(get_durations(args.inputs))
+    chapters = read_ffmetadata_chapters(args.metadata) if args.metadata else None
+
+    report = verify_m4b(
+        args.m4b, expected_duration, chapters, args.title, args.author,
+        expect_cover=args.cover, decode=not args.no_decode, workers=args.workers
+    )
+    print_report(report)
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import subprocess
+import threading
+
+from .cache import cache_dir, file_key
+from .profile import source_info
+
+PEAK_BINS = 200
+READ_SAMPLES = 1 << 18
+# Full-scale samples a bin needs to count as clipped; audio normalized
+# to 0 dBFS touches full scale once or twice, real clipping far more
+CLIP_SAMPLES = 3
+# Bump when the cached array's layout changes
+CACHE_VERSION = 2
+
+
+def content_hash(path):
+    """
+    BLAKE2 hash of a file's contents.
+
+    The hash is remembered per path/size/mtime, so unchanged files are
+    only hashed once.
+    """
+    memo_path = os.path.join(cache_dir("waveform", "keys"), file_key(path))
+    try:
+        with open(memo_path, encoding="ascii") as f:
+            return f.read().strip()
+    except OSError:
+        pass
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    value = digest.hexdigest()
+    with open(memo_path, "w", encoding="ascii") as f:
+        f.write(value)
+    return value
+
+
+def compute_peaks(path, duration, bins=PEAK_BINS):
+    """
+    Min/max peaks and clipped sample counts of a file's audio in a fixed
+    number of bins.
+
+    ffmpeg decodes every channel at the source rate, so the peaks are the
+    real sample values, not ones smoothed by downmixing or resampling;
+    the stream is reduced chunk by chunk with vectorized reduceat calls,
+    so memory stays constant. Returns a float32 array of shape (bins, 3):
+    min and max in [-1, 1] and the number of samples at full scale. Bins
+    past the end of the decodable audio stay at zero, which shows
+    truncated files.
+    """
+    import numpy as np
+
+    channels, sample_rate, _ = source_info(path)
+    total = max(int(duration * sample_rate), bins)
+    per_bin = -(-total // bins)
+    mins = np.zeros(bins, np.int16)
+    maxs = np.zeros(bins, np.int16)
+    clipped = np.zeros(bins, np.int64)
+
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", path,
+        "-map", "0:a:0", "-ac", str(channels), "-ar", str(sample_rate),
+        "-f", "s16le", "-"
+    ]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    position = 0  # in samples across all channels
+    pending = b""
+    try:
+        while True:
+            data = process.stdout.read(READ_SAMPLES * 2)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 2
+            pending = data[usable:]
+            chunk = np.frombuffer(data[:usable], np.int16)
+            if len(chunk) == 0:
+                continue
+
+            frame = (position + np.arange(len(chunk))) // channels
+            idx = np.minimum(frame // per_bin, bins - 1)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(idx)) + 1))
+            bin_ids = idx[starts]
+            mins[bin_ids] = np.minimum(mins[bin_ids], np.minimum.reduceat(chunk, starts))
+            maxs[bin_ids] = np.maximum(maxs[bin_ids], np.maximum.reduceat(chunk, starts))
+            full_scale = (chunk >= 32767) | (chunk <= -32767)
+            clipped[bin_ids] += np.add.reduceat(full_scale.astype(np.int64), starts)
+            position += len(chunk)
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    peaks = np.stack([mins, maxs], axis=1).astype(np.float32) / 32768.0
+    return np.column_stack([peaks, clipped.astype(np.float32)])
+
+
+def is_clipped(column):
+    """Whether a (min, max, clipped count) row of compute_peaks' result is clipped."""
+    return column[2] >= CLIP_SAMPLES
+
+
+def get_peaks(path, duration):
+    """Return a file's waveform peaks, from the on-disk cache when possible."""
+    import numpy as np
+
+    cache_path = os.path.join(cache_dir("waveform"), f"{content_hash(path)}.v{CACHE_VERSION}.npy")
+    try:
+        return np.load(cache_path)
+    except (OSError, ValueError):
+        pass
+
+    peaks = compute_peaks(path, duration)
+    tmp_path = f"{cache_path}.{os.getpid()}-{threading.get_ident()}.tmp.npy"
+    np.save(tmp_path, peaks)
+    os.replace(tmp_path, cache_path)
+    return peaks
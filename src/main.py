@@ -1,26 +1,54 @@
 import sys
 import os
-import subprocess
 import json
+import threading
+import uuid
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QAction, QPixmap, QIcon
+from PySide6.QtCore import (
+    Qt, QThread, QThreadPool, QRunnable, QObject, QLineF, Signal, QStandardPaths
+)
+from PySide6.QtGui import QAction, QPixmap, QIcon, QPainter, QPen, QColor
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QLabel, QPushButton, QTableWidget, QTableWidgetItem,
     QFileDialog, QAbstractItemView, QMenu, QGroupBox, QLineEdit,
     QProgressBar, QMessageBox, QGridLayout, QHeaderView, QCheckBox,
-    QSizePolicy, QStatusBar
+    QSizePolicy, QStatusBar, QSpinBox, QStyledItemDelegate
 )
 
-from PIL import Image, ImageQt
 from version import __version__
+from core.parts import convert_parts
+from core.probe import get_duration
+from core.repeats import apply_trims, find_repeats
+from core.runner import ConversionCancelled
+from core.seekindex import PCM_CHANNELS, PCM_RATE, decode_range, get_seek_index
+from core.waveform import get_peaks, is_clipped
+
+PREVIEW_SECONDS = 5
 
 def get_downloads_folder():
     """Return the user's Downloads folder cross‐platform."""
     home = os.path.expanduser("~")
     return os.path.join(home, "Downloads")
 
+def get_queue_file():
+    """Return where the job queue is kept between sessions."""
+    folder = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, "queue.json")
+
+def build_seek_index_quietly(path):
+    """Build a file's seek index ahead of its first preview."""
+    try:
+        get_seek_index(path)
+    except Exception:
+        pass  # The preview itself reports the error
+
+def verification_error(report):
+    """Return the error message for a run report whose outputs failed verification."""
+    problems = [p for o in report["outputs"] for p in o["verify"]["problems"]]
+    return "The output file failed verification:\n" + "\n".join(problems)
+
 class ToggleSwitch(QCheckBox):
     """
     A QCheckBox that is styled to look like a toggle (pure QSS, no image files).
@@ -126,8 +154,9 @@ class CoverArtWidget(QWidget):
     def set_cover_image(self, path):
         try:
             self.cover_path = path
-            image = Image.open(path)
+            from PIL import Image
             from PIL.ImageQt import ImageQt
+            image = Image.open(path)
             qimage = ImageQt(image)
             pixmap = QPixmap.fromImage(qimage)
 
@@ -162,6 +191,154 @@ class CoverArtWidget(QWidget):
         self.update()
 
 
+class WaveformSignals(QObject):
+    done = Signal(str, object)  # path, peaks (None if the file couldn't be decoded)
+
+
+class WaveformWorker(QRunnable):
+    """Computes (or loads from the cache) one file's waveform peaks in the thread pool."""
+    def __init__(self, path, duration, signals):
+        super().__init__()
+        self.path = path
+        self.duration = duration
+        self.signals = signals
+
+    def run(self):
+        try:
+            peaks = get_peaks(self.path, self.duration)
+        except Exception:
+            peaks = None
+        self.signals.done.emit(self.path, peaks)
+
+
+class PreviewSignals(QObject):
+    done = Signal(int, object)  # request number, PCM bytes
+    failed = Signal(int, str)
+
+
+class PreviewWorker(QRunnable):
+    """Decodes the preview ranges off the UI thread, so long or remote files don't block it."""
+    def __init__(self, request, ranges, signals):
+        super().__init__()
+        self.request = request
+        self.ranges = ranges  # (path, start, length) tuples, played back to back
+        self.signals = signals
+
+    def run(self):
+        try:
+            pcm = b"".join(decode_range(path, start, length) for path, start, length in self.ranges)
+        except Exception as e:
+            self.signals.failed.emit(self.request, str(e))
+        else:
+            self.signals.done.emit(self.request, pcm)
+
+
+class WaveformDelegate(QStyledItemDelegate):
+    """
+    Draws the min/max peaks stored in a cell's UserRole data.
+
+    Each waveform is rendered to a pixmap once per cell size, so repaints
+    only blit cached pixmaps. Columns where the source has several
+    samples at full scale are drawn in red as clipped.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pixmaps = {}
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        data = index.data(Qt.UserRole)
+        if data is None:
+            return
+        path, peaks = data
+        rect = option.rect.adjusted(4, 3, -4, -3)
+        if rect.width() <= 0 or rect.height() <= 0:
+            return
+        key = (path, rect.width(), rect.height())
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            if len(self._pixmaps) > 2000:
+                self._pixmaps.clear()
+            pixmap = self.render_peaks(peaks, rect.width(), rect.height())
+            self._pixmaps[key] = pixmap
+        painter.drawPixmap(rect.topLeft(), pixmap)
+
+    def render_peaks(self, peaks, width, height):
+        import numpy as np
+
+        pixmap = QPixmap(width, height)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        normal = QPen(QColor("#4A90E2"), 1)
+        clipped = QPen(QColor("#E24A4A"), 1)
+        mid = height / 2
+        columns = peaks[np.linspace(0, len(peaks) - 1, width).astype(int)]
+        for x, column in enumerate(columns):
+            lo, hi = column[0], column[1]
+            painter.setPen(clipped if is_clipped(column) else normal)
+            painter.drawLine(QLineF(x, mid - hi * mid, x, mid - lo * mid))
+        painter.end()
+        return pixmap
+
+
+class ConversionWorker(QThread):
+    """
+    Runs one queued job off the UI thread.
+
+    convert_book gives every run its own temporary workspace, so several
+    workers can convert into the same output folder at once.
+    """
+    progress = Signal(str, int)
+    job_finished = Signal(str, str, str)  # job id, status, message
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        job = self.job
+        try:
+            report = convert_parts(
+                job["chapters"], job["output"], job["title"], job["author"],
+                max_seconds=job.get("max_hours", 0) * 3600,
+                max_bytes=job.get("max_mb", 0) * 1024 * 1024,
+                merge=job["merge"],
+                cover_path=job["cover_path"],
+                bitrate="auto" if job["auto"] else "128k",
+                on_progress=lambda pct: self.progress.emit(job["id"], int(pct)),
+                cancel_event=self.cancel_event
+            )
+        except ConversionCancelled:
+            self.job_finished.emit(job["id"], "Canceled", "")
+        except Exception as e:
+            self.job_finished.emit(job["id"], "Failed", str(e))
+        else:
+            if report["ok"]:
+                self.job_finished.emit(job["id"], "Done", "")
+            else:
+                self.job_finished.emit(job["id"], "Failed", verification_error(report))
+
+
+class RepeatsWorker(QThread):
+    """Looks for repeated intros/outros off the UI thread."""
+    found = Signal(object)  # list of repeats
+    failed = Signal(str)
+
+    def __init__(self, chapters, parent=None):
+        super().__init__(parent)
+        self.chapters = chapters
+
+    def run(self):
+        try:
+            self.found.emit(find_repeats(self.chapters))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
 class M4BFusionPro(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -171,6 +348,23 @@ class M4BFusionPro(QMainWindow):
 
         self.chapters = []
         self.output_folder = None
+        self.jobs = []
+        self.workers = {}
+        self.job_progress = {}
+        self.job_progress_bars = {}
+        self.queue_running = False
+        self.audio_sink = None
+        self.preview_request = 0
+        # Previews get their own pool so they never wait behind the waveform
+        # and seek index jobs queued on the global pool for every added file
+        self.preview_pool = QThreadPool(self)
+        self.preview_pool.setMaxThreadCount(2)
+        self.preview_signals = PreviewSignals(self)
+        self.preview_signals.done.connect(self.on_preview_ready)
+        self.preview_signals.failed.connect(self.on_preview_failed)
+        self.waveforms = {}
+        self.waveform_signals = WaveformSignals(self)
+        self.waveform_signals.done.connect(self.on_waveform_ready)
 
         # Main widget + layout
         central = QWidget()
@@ -197,6 +391,7 @@ class M4BFusionPro(QMainWindow):
         self.statusBar().addPermanentWidget(self.progress_bar, 1)
 
         self.set_dark_stylesheet()
+        self.load_queue()
 
     def set_dark_stylesheet(self):
         """
@@ -259,6 +454,13 @@ class M4BFusionPro(QMainWindow):
         QPushButton#primaryButton:hover {
             background-color: #005BBB;
         }
+        QPushButton#smallButton {
+            border-radius: 10px;
+            font-size: 10pt;
+            padding: 2px 10px;
+            min-width: 0px;
+            min-height: 0px;
+        }
         QLineEdit {
             background-color: #1F1F1F;
             border: 1px solid #4A4A4A;
@@ -309,6 +511,11 @@ class M4BFusionPro(QMainWindow):
         self.btn_clear_all.clicked.connect(self.on_clear_all)
         btn_row.addWidget(self.btn_clear_all)
 
+        self.btn_find_repeats = QPushButton("Find Repeats")
+        self.btn_find_repeats.setToolTip("Find intros/outros repeated across files and offer to trim them")
+        self.btn_find_repeats.clicked.connect(self.on_find_repeats)
+        btn_row.addWidget(self.btn_find_repeats)
+
         self.up_button = QPushButton("↑ Up")
         self.up_button.clicked.connect(self.on_move_up)
         self.up_button.setEnabled(False)
@@ -320,14 +527,17 @@ class M4BFusionPro(QMainWindow):
         btn_row.addWidget(self.down_button)
 
         # Table
-        self.table = QTableWidget(0, 2)
-        self.table.setHorizontalHeaderLabels(["File/chapter name", "Duration"])
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["File/chapter name", "Duration", "Waveform"])
         self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.table.verticalHeader().setVisible(False)
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Fixed)
+        self.table.setColumnWidth(2, 160)
+        self.table.setItemDelegateForColumn(2, WaveformDelegate(self.table))
 
         self.table.itemSelectionChanged.connect(self.toggle_up_down_buttons)
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -335,6 +545,45 @@ class M4BFusionPro(QMainWindow):
 
         layout.addWidget(self.table, stretch=1)
 
+        self.init_queue_panel(layout)
+
+    def init_queue_panel(self, layout: QVBoxLayout):
+        queue_group = QGroupBox("Job Queue")
+        queue_layout = QVBoxLayout(queue_group)
+        layout.addWidget(queue_group, stretch=1)
+
+        self.queue_table = QTableWidget(0, 4)
+        self.queue_table.setHorizontalHeaderLabels(["Book", "Status", "Progress", ""])
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queue_table.verticalHeader().setVisible(False)
+        header = self.queue_table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.ResizeToContents)
+        queue_layout.addWidget(self.queue_table)
+
+        controls = QHBoxLayout()
+        queue_layout.addLayout(controls)
+
+        controls.addWidget(QLabel("Parallel jobs:"))
+        self.spin_parallel = QSpinBox()
+        self.spin_parallel.setRange(1, max(1, os.cpu_count() or 1))
+        self.spin_parallel.setValue(min(2, self.spin_parallel.maximum()))
+        self.spin_parallel.valueChanged.connect(self.on_parallel_changed)
+        controls.addWidget(self.spin_parallel)
+        controls.addStretch(1)
+
+        self.btn_clear_finished = QPushButton("Clear Finished")
+        self.btn_clear_finished.clicked.connect(self.on_clear_finished)
+        controls.addWidget(self.btn_clear_finished)
+
+        self.btn_run_queue = QPushButton("Run Queue")
+        self.btn_run_queue.setObjectName("primaryButton")
+        self.btn_run_queue.clicked.connect(self.on_run_queue)
+        controls.addWidget(self.btn_run_queue)
+
     def init_right_panel(self, layout: QVBoxLayout):
         # Cover art
         cover_group = QGroupBox("Cover Art")
@@ -370,6 +619,33 @@ class M4BFusionPro(QMainWindow):
         merge_layout.addStretch(1)
         layout.addLayout(merge_layout)
 
+        # Auto encode profile row
+        auto_layout = QHBoxLayout()
+        lbl_auto = QLabel("Pick bitrate and mono/stereo from the sources:")
+        self.toggle_auto = ToggleSwitch()
+        auto_layout.addWidget(lbl_auto)
+        auto_layout.addWidget(self.toggle_auto)
+        auto_layout.addStretch(1)
+        layout.addLayout(auto_layout)
+
+        # Part size/length limits row
+        parts_layout = QHBoxLayout()
+        lbl_parts = QLabel("Split into parts of at most:")
+        self.spin_part_hours = QSpinBox()
+        self.spin_part_hours.setRange(0, 999)
+        self.spin_part_hours.setSuffix(" h")
+        self.spin_part_hours.setSpecialValueText("Any length")
+        self.spin_part_mb = QSpinBox()
+        self.spin_part_mb.setRange(0, 100000)
+        self.spin_part_mb.setSingleStep(100)
+        self.spin_part_mb.setSuffix(" MB")
+        self.spin_part_mb.setSpecialValueText("Any size")
+        parts_layout.addWidget(lbl_parts)
+        parts_layout.addWidget(self.spin_part_hours)
+        parts_layout.addWidget(self.spin_part_mb)
+        parts_layout.addStretch(1)
+        layout.addLayout(parts_layout)
+
         # Output row
         output_row = QHBoxLayout()
         layout.addLayout(output_row)
@@ -386,6 +662,11 @@ class M4BFusionPro(QMainWindow):
         self.btn_convert.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         output_row.addWidget(self.btn_convert)
 
+        self.btn_add_job = QPushButton("Add to Queue")
+        self.btn_add_job.clicked.connect(self.on_add_job)
+        self.btn_add_job.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        layout.addWidget(self.btn_add_job)
+
         layout.addStretch(1)
 
     # -------------------------------------------------------------
@@ -410,7 +691,7 @@ class M4BFusionPro(QMainWindow):
 
     def add_chapter(self, file_path):
         try:
-            duration = self.get_duration(file_path)
+            duration = get_duration(file_path)
             base = os.path.splitext(os.path.basename(file_path))[0]
             self.chapters.append({
                 "path": file_path,
@@ -418,6 +699,11 @@ class M4BFusionPro(QMainWindow):
                 "duration": duration
             })
             self.refresh_table()
+            QThreadPool.globalInstance().start(lambda: build_seek_index_quietly(file_path))
+            if file_path not in self.waveforms:
+                QThreadPool.globalInstance().start(
+                    WaveformWorker(file_path, duration, self.waveform_signals)
+                )
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Couldn't add file:\n{str(e)}")
 
@@ -428,6 +714,23 @@ class M4BFusionPro(QMainWindow):
             duration_item = QTableWidgetItem(self.format_duration(ch["duration"]))
             self.table.setItem(i, 0, name_item)
             self.table.setItem(i, 1, duration_item)
+            self.table.setItem(i, 2, self.waveform_item(ch["path"]))
+
+    def waveform_item(self, path):
+        item = QTableWidgetItem()
+        if path not in self.waveforms:
+            item.setText("…")
+        elif self.waveforms[path] is None:
+            item.setText("n/a")
+        else:
+            item.setData(Qt.UserRole, (path, self.waveforms[path]))
+        return item
+
+    def on_waveform_ready(self, path, peaks):
+        self.waveforms[path] = peaks
+        for i, ch in enumerate(self.chapters):
+            if ch["path"] == path:
+                self.table.setItem(i, 2, self.waveform_item(path))
 
     def on_table_context_menu(self, pos):
         row_index = self.table.currentRow()
@@ -437,6 +740,22 @@ class M4BFusionPro(QMainWindow):
         delete_action = QAction("Delete", self)
         delete_action.triggered.connect(self.on_delete_selected)
         menu.addAction(delete_action)
+
+        menu.addSeparator()
+        preview_start = QAction("Preview Start", self)
+        preview_start.triggered.connect(lambda: self.on_preview(row_index, "start"))
+        menu.addAction(preview_start)
+        preview_end = QAction("Preview End", self)
+        preview_end.triggered.connect(lambda: self.on_preview(row_index, "end"))
+        menu.addAction(preview_end)
+        if row_index < len(self.chapters) - 1:
+            preview_boundary = QAction("Preview Boundary with Next", self)
+            preview_boundary.triggered.connect(lambda: self.on_preview(row_index, "boundary"))
+            menu.addAction(preview_boundary)
+        if self.audio_sink is not None:
+            stop_preview = QAction("Stop Preview", self)
+            stop_preview.triggered.connect(self.stop_preview)
+            menu.addAction(stop_preview)
         menu.exec(self.table.mapToGlobal(pos))
 
     def on_delete_selected(self):
@@ -475,6 +794,108 @@ class M4BFusionPro(QMainWindow):
         for row in sel:
             self.table.selectRow(min(row + 1, len(self.chapters) - 1))
 
+    # -------------------------------------------------------------
+    #  REPEATED INTROS / OUTROS
+    # -------------------------------------------------------------
+    def on_find_repeats(self):
+        if len(self.chapters) < 2:
+            QMessageBox.information(self, "Find Repeats", "Add at least two files first.")
+            return
+        self.set_ui_enabled(False)
+        self.statusBar().showMessage("Looking for repeated intros/outros…")
+        self.repeats_worker = RepeatsWorker(list(self.chapters), self)
+        self.repeats_worker.found.connect(self.on_repeats_found)
+        self.repeats_worker.failed.connect(self.on_repeats_failed)
+        self.repeats_worker.start()
+
+    def on_repeats_found(self, repeats):
+        self.set_ui_enabled(True)
+        self.statusBar().clearMessage()
+        chapters = self.repeats_worker.chapters
+        if not repeats:
+            QMessageBox.information(self, "Find Repeats", "No repeated intros/outros found.")
+            return
+        lines = []
+        for r in repeats:
+            kind = "intro" if r["part"] == "head" else "outro"
+            lines.append(f"{chapters[r['chapter']]['name']}: {kind} "
+                         f"{self.format_duration(r['start'])}–{self.format_duration(r['end'])} "
+                         f"(same as {chapters[r['matches']]['name']})")
+        answer = QMessageBox.question(
+            self, "Find Repeats",
+            "These segments repeat audio heard earlier in the book:\n\n" + "\n".join(lines)
+            + "\n\nTrim them, keeping the first occurrence?"
+        )
+        # Only apply if the list wasn't edited while the search ran
+        if answer == QMessageBox.Yes and chapters == self.chapters:
+            self.chapters = apply_trims(chapters, repeats)
+            self.refresh_table()
+
+    def on_repeats_failed(self, message):
+        self.set_ui_enabled(True)
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Couldn't look for repeats:\n{message}")
+
+    # -------------------------------------------------------------
+    #  PREVIEW
+    # -------------------------------------------------------------
+    def on_preview(self, row, where):
+        """Play the start or end of a row, or the boundary between it and the next one."""
+        ch = self.chapters[row]
+        # Trimmed rows play from their inpoint, the way they will be converted
+        start = ch.get("inpoint", 0)
+        tail_start = start + max(ch["duration"] - PREVIEW_SECONDS, 0)
+        if where == "start":
+            ranges = [(ch["path"], start, PREVIEW_SECONDS)]
+        elif where == "end":
+            ranges = [(ch["path"], tail_start, PREVIEW_SECONDS)]
+        else:
+            nxt = self.chapters[row + 1]
+            ranges = [(ch["path"], tail_start, PREVIEW_SECONDS),
+                      (nxt["path"], nxt.get("inpoint", 0), PREVIEW_SECONDS)]
+        # Only the latest request plays, if several finish decoding out of order
+        self.preview_request += 1
+        self.statusBar().showMessage("Loading preview…")
+        self.preview_pool.start(
+            PreviewWorker(self.preview_request, ranges, self.preview_signals)
+        )
+
+    def on_preview_ready(self, request, pcm):
+        if request != self.preview_request:
+            return
+        self.statusBar().clearMessage()
+        self.play_pcm(pcm)
+
+    def on_preview_failed(self, request, message):
+        if request != self.preview_request:
+            return
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Couldn't preview file:\n{message}")
+
+    def play_pcm(self, pcm):
+        from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+        from PySide6.QtMultimedia import QAudioFormat, QAudioSink, QMediaDevices
+
+        self.stop_preview()
+        fmt = QAudioFormat()
+        fmt.setSampleRate(PCM_RATE)
+        fmt.setChannelCount(PCM_CHANNELS)
+        fmt.setSampleFormat(QAudioFormat.Int16)
+
+        self.preview_buffer = QBuffer(self)
+        self.preview_buffer.setData(QByteArray(pcm))
+        self.preview_buffer.open(QIODevice.ReadOnly)
+        self.audio_sink = QAudioSink(QMediaDevices.defaultAudioOutput(), fmt, self)
+        self.audio_sink.start(self.preview_buffer)
+
+    def stop_preview(self):
+        if self.audio_sink is not None:
+            self.audio_sink.stop()
+            self.audio_sink.deleteLater()
+            self.audio_sink = None
+            self.preview_buffer.close()
+            self.preview_buffer.deleteLater()
+
     # -------------------------------------------------------------
     #  OUTPUT / CONVERSION
     # -------------------------------------------------------------
@@ -523,163 +944,244 @@ class M4BFusionPro(QMainWindow):
         self.txt_author.setEnabled(enabled)
         self.btn_save_to.setEnabled(enabled)
         self.btn_convert.setEnabled(enabled)
+        self.btn_add_job.setEnabled(enabled)
+        self.btn_find_repeats.setEnabled(enabled)
         self.toggle_merge.setEnabled(enabled)
+        self.toggle_auto.setEnabled(enabled)
+        self.spin_part_hours.setEnabled(enabled)
+        self.spin_part_mb.setEnabled(enabled)
         self.setCursor(Qt.WaitCursor if not enabled else Qt.ArrowCursor)
 
     def run_conversion(self):
-        merge_files = self.toggle_merge.isChecked()
-        filelist_path = os.path.join(self.output_folder, "filelist.txt")
-        metadata_path = os.path.join(self.output_folder, "metadata.txt")
-        cover_temp = os.path.join(self.output_folder, "temp_cover.jpg")
-
-        # Write file list
-        with open(filelist_path, "w") as f:
-            for ch in self.chapters:
-                f.write(f"file '{ch['path']}'\n")
-
-        cover_path = None
-        if self.cover_widget.cover_path:
-            cover_path = cover_temp
-            self.process_cover_image(self.cover_widget.cover_path, cover_temp)
-
-        out_file = os.path.join(
-            self.output_folder,
-            f"{self.txt_title.text().strip()}.m4b"
+        title = self.txt_title.text().strip()
+        out_file = self.unique_output(os.path.join(self.output_folder, f"{title}.m4b"))
+
+        report = convert_parts(
+            self.chapters, out_file, title, self.txt_author.text().strip(),
+            max_seconds=self.spin_part_hours.value() * 3600,
+            max_bytes=self.spin_part_mb.value() * 1024 * 1024,
+            merge=self.toggle_merge.isChecked(),
+            cover_path=self.cover_widget.cover_path,
+            bitrate="auto" if self.toggle_auto.isChecked() else "128k",
+            on_progress=self.on_progress
         )
-
-        if merge_files:
-            # Merge into one single track
-            cmd = [
-                "ffmpeg", "-y",
-                "-f", "concat", "-safe", "0",
-                "-i", filelist_path
-            ]
-            if cover_path:
-                cmd += ["-i", cover_path]
-
-            cmd += [
-                "-map", "0:a",
-                "-c:a", "aac", "-b:a", "128k",
-                "-metadata", f"title={self.txt_title.text().strip()}",
-                "-metadata", f"artist={self.txt_author.text().strip()}"
-            ]
-            if cover_path:
-                cmd += [
-                    "-map", "1:v",
-                    "-c:v", "copy",
-                    "-disposition:v", "attached_pic"
-                ]
-            cmd.append(out_file)
-        else:
-            # Multiple chapters
-            self.create_ffmetadata(metadata_path)
-            cmd = [
-                "ffmpeg", "-y",
-                "-f", "concat", "-safe", "0",
-                "-i", filelist_path,
-                "-i", metadata_path
-            ]
-            if cover_path:
-                cmd += ["-i", cover_path]
-            cmd += [
-                "-map_metadata", "1",
-                "-map", "0:a",
-                "-c:a", "aac", "-b:a", "128k",
-                "-metadata", f"title={self.txt_title.text().strip()}",
-                "-metadata", f"artist={self.txt_author.text().strip()}"
-            ]
-            if cover_path:
-                cmd += [
-                    "-map", "2:v",
-                    "-c:v", "copy",
-                    "-disposition:v", "attached_pic"
-                ]
-            cmd.append(out_file)
-
-        self.ffmpeg_run(cmd)
-        # Clean up
-        for f in [filelist_path, metadata_path, cover_temp]:
-            if os.path.exists(f):
-                os.remove(f)
+        message = f"Wrote {report['bytes_written'] / 1024 / 1024:.1f} MB"
+        if "parts" in report:
+            message += f" in {len(report['parts'])} parts"
+        profile = report["profile"]
+        if profile:
+            message += (f" — auto profile: {profile['channels']} ch, {profile['sample_rate']} Hz, "
+                        f"{profile['bitrate']} ({profile['reason']})")
+        self.statusBar().showMessage(message)
+
+        if not report["ok"]:
+            raise RuntimeError(verification_error(report))
         self.progress_bar.setValue(100)
 
-    def ffmpeg_run(self, cmd):
-        total_sec = sum(ch["duration"] for ch in self.chapters)
-        process = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True)
+    def on_progress(self, pct):
+        self.progress_bar.setValue(int(pct))
+        if pct >= 100:
+            self.statusBar().showMessage("Verifying output…")
+        QApplication.processEvents()
+
+    # -------------------------------------------------------------
+    #  JOB QUEUE
+    # -------------------------------------------------------------
+    def on_add_job(self):
+        if not self.output_folder:
+            self.output_folder = get_downloads_folder()
+
+        if not self.validate_inputs():
+            return
 
-        while True:
-            line = process.stderr.readline()
-            if not line and process.poll() is not None:
+        title = self.txt_title.text().strip()
+        output = self.unique_output(os.path.join(self.output_folder, f"{title}.m4b"))
+        self.jobs.append({
+            "id": uuid.uuid4().hex,
+            "title": title,
+            "author": self.txt_author.text().strip(),
+            "chapters": [dict(ch) for ch in self.chapters],
+            "cover_path": self.cover_widget.cover_path,
+            "merge": self.toggle_merge.isChecked(),
+            "auto": self.toggle_auto.isChecked(),
+            "max_hours": self.spin_part_hours.value(),
+            "max_mb": self.spin_part_mb.value(),
+            "output": output,
+            "status": "Pending",
+            "message": ""
+        })
+        self.save_queue()
+        self.refresh_queue_table()
+
+        # Clear the form so the next book can be staged
+        self.on_clear_all()
+        self.txt_title.clear()
+        self.txt_author.clear()
+        self.cover_widget.clear_cover()
+
+        self.schedule_jobs()
+
+    def on_run_queue(self):
+        self.queue_running = True
+        self.schedule_jobs()
+
+    def on_parallel_changed(self, value):
+        self.save_queue()
+        self.schedule_jobs()
+
+    def schedule_jobs(self):
+        if not self.queue_running:
+            return
+        for job in self.jobs:
+            if len(self.workers) >= self.spin_parallel.value():
                 break
-            if "time=" in line:
-                time_str = line.split("time=")[1].split()[0]
-                current_sec = self.time_to_seconds(time_str)
-                pct = (current_sec / total_sec) * 100 if total_sec > 0 else 0
-                self.progress_bar.setValue(int(pct))
-                QApplication.processEvents()
-
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, cmd)
-
-    def process_cover_image(self, src, dest):
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", src,
-            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2,format=yuvj420p",
-            "-q:v", "2", "-frames:v", "1",
-            dest
+            # Never run two jobs into the same file, e.g. from an older saved queue
+            if job["status"] == "Pending" and not self.output_in_use(job["output"], ("Running",)):
+                self.start_job(job)
+        if not self.workers:
+            self.queue_running = False
+
+    def output_in_use(self, path, statuses=("Pending", "Running")):
+        """True if a job with one of the given statuses writes to path."""
+        key = os.path.normcase(os.path.abspath(path))
+        return any(
+            job["status"] in statuses
+            and os.path.normcase(os.path.abspath(job["output"])) == key
+            for job in self.jobs
+        )
+
+    def unique_output(self, path):
+        """path, or "<name> (2).m4b" etc. if a pending or running job already writes there."""
+        root, ext = os.path.splitext(path)
+        n = 1
+        while self.output_in_use(path):
+            n += 1
+            path = f"{root} ({n}){ext}"
+        return path
+
+    def start_job(self, job):
+        job["status"] = "Running"
+        job["message"] = ""
+        worker = ConversionWorker(job, self)
+        worker.progress.connect(self.on_job_progress)
+        worker.job_finished.connect(self.on_job_finished)
+        self.workers[job["id"]] = worker
+        worker.start()
+        self.save_queue()
+        self.refresh_queue_table()
+
+    def find_job(self, job_id):
+        return next((job for job in self.jobs if job["id"] == job_id), None)
+
+    def on_job_progress(self, job_id, pct):
+        self.job_progress[job_id] = pct
+        bar = self.job_progress_bars.get(job_id)
+        if bar is not None:
+            bar.setValue(pct)
+
+    def on_job_finished(self, job_id, status, message):
+        worker = self.workers.pop(job_id, None)
+        self.job_progress.pop(job_id, None)
+        if worker is not None:
+            worker.wait()
+            worker.deleteLater()
+        job = self.find_job(job_id)
+        if job is not None:
+            job["status"] = status
+            job["message"] = message
+        self.save_queue()
+        self.refresh_queue_table()
+        self.schedule_jobs()
+
+    def on_cancel_job(self, job_id):
+        worker = self.workers.get(job_id)
+        if worker is not None:
+            worker.cancel()
+            return
+        job = self.find_job(job_id)
+        if job is not None and job["status"] == "Pending":
+            job["status"] = "Canceled"
+            self.save_queue()
+            self.refresh_queue_table()
+
+    def on_clear_finished(self):
+        self.jobs = [job for job in self.jobs if job["status"] in ("Pending", "Running")]
+        self.save_queue()
+        self.refresh_queue_table()
+
+    def refresh_queue_table(self):
+        self.job_progress_bars = {}
+        self.queue_table.setRowCount(len(self.jobs))
+        for i, job in enumerate(self.jobs):
+            name_item = QTableWidgetItem(f"{job['title']} — {job['author']}")
+            name_item.setToolTip(job["output"])
+            status_item = QTableWidgetItem(job["status"])
+            if job["message"]:
+                status_item.setToolTip(job["message"])
+            self.queue_table.setItem(i, 0, name_item)
+            self.queue_table.setItem(i, 1, status_item)
+
+            bar = QProgressBar()
+            bar.setValue(100 if job["status"] == "Done" else self.job_progress.get(job["id"], 0))
+            self.queue_table.setCellWidget(i, 2, bar)
+            self.job_progress_bars[job["id"]] = bar
+
+            if job["status"] in ("Pending", "Running"):
+                btn_cancel = QPushButton("Cancel")
+                btn_cancel.setObjectName("smallButton")
+                btn_cancel.clicked.connect(lambda _=False, job_id=job["id"]: self.on_cancel_job(job_id))
+                self.queue_table.setCellWidget(i, 3, btn_cancel)
+            else:
+                self.queue_table.removeCellWidget(i, 3)
+
+    def load_queue(self):
+        try:
+            with open(get_queue_file(), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.jobs = data.get("jobs", [])
+        for job in self.jobs:
+            # Jobs interrupted by the last shutdown start over
+            if job["status"] == "Running":
+                job["status"] = "Pending"
+        self.spin_parallel.setValue(data.get("max_parallel", self.spin_parallel.value()))
+        self.refresh_queue_table()
+
+    def save_queue(self):
+        jobs = [
+            dict(job, status="Pending") if job["status"] == "Running" else job
+            for job in self.jobs
         ]
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-    def create_ffmetadata(self, metadata_path):
-        with open(metadata_path, "w") as f:
-            f.write(";FFMETADATA1\n")
-            current_time = 0.0
-            for c in self.chapters:
-                end_time = current_time + c["duration"]
-                f.write(
-                    f"[CHAPTER]\n"
-                    f"TIMEBASE=1/1000\n"
-                    f"START={int(current_time * 1000)}\n"
-                    f"END={int(end_time * 1000)}\n"
-                    f"title={c['name']}\n\n"
-                )
-                current_time = end_time
+        data = {"max_parallel": self.spin_parallel.value(), "jobs": jobs}
+        try:
+            with open(get_queue_file(), "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except OSError as e:
+            self.statusBar().showMessage(f"Couldn't save the job queue: {e}")
+
+    def closeEvent(self, event):
+        # Stop running jobs; they are saved as pending and rerun next time
+        for worker in self.workers.values():
+            worker.cancel()
+        for worker in self.workers.values():
+            worker.wait()
+        self.save_queue()
+        super().closeEvent(event)
 
     # -------------------------------------------------------------
     #  UTILS
     # -------------------------------------------------------------
-    def get_duration(self, path: str) -> float:
-        cmd = [
-            "ffprobe", "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "json", path
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"Couldn't get duration for {os.path.basename(path)}")
-        data = json.loads(result.stdout)
-        return float(data["format"]["duration"])
-
     def format_duration(self, secs: float) -> str:
         hrs = int(secs // 3600)
         mins = int((secs % 3600) // 60)
         s = int(secs % 60)
         return f"{hrs:02d}:{mins:02d}:{s:02d}"
 
-    def time_to_seconds(self, time_str: str) -> float:
-        parts = time_str.split(":")
-        if len(parts) == 3:
-            h, m, s = parts
-            return float(h)*3600 + float(m)*60 + float(s)
-        elif len(parts) == 2:
-            m, s = parts
-            return float(m)*60 + float(s)
-        return float(parts[0])
-
 
 def main():
     app = QApplication(sys.argv)
+    app.setApplicationName("M4BFusion Pro")
 
     # Set application icon
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -0,0 +1,14 @@
+import importlib
+import pkgutil
+
+import src.core as core
+
+
+def test_exports_do_not_shadow_submodules():
+    submodules = {m.name for m in pkgutil.iter_modules(core.__path__)}
+    assert not submodules & set(core.__all__)
+
+
+def test_exports_resolve_to_their_module_attribute():
+    for name, module in core._EXPORTS.items():
+        assert getattr(core, name) is getattr(importlib.import_module(f"src.core.{module}"), name)
@@ -0,0 +1,26 @@
+from src.core import layout
+
+
+def test_moov_size_is_page_aligned_and_grows_with_inputs():
+    base = layout.estimate_moov_size(3600, 44100)
+    assert base % 4096 == 0
+    assert layout.estimate_moov_size(7200, 44100) > base
+    assert layout.estimate_moov_size(3600, 44100, chapters=["Chapter"] * 200) > base
+    assert layout.estimate_moov_size(3600, 44100, cover_size=500_000) >= base + 500_000
+
+
+def test_moov_size_covers_the_sample_table():
+    # 30 h at 48 kHz: one 4-byte stsz entry per 1024-sample AAC frame
+    duration = 30 * 3600
+    frames = duration * 48000 / 1024
+    assert layout.estimate_moov_size(duration, 48000) > 4 * frames
+    # Without a known rate the estimate assumes the highest one
+    assert layout.estimate_moov_size(duration) == layout.estimate_moov_size(duration, 48000)
+
+
+def test_layout_args_and_bytes_written():
+    assert layout.layout_args(layout.PLAIN) == []
+    assert layout.layout_args(layout.FASTSTART) == ["-movflags", "+faststart"]
+    assert layout.layout_args(layout.RESERVE, 8192) == ["-moov_size", "8192"]
+    assert layout.bytes_written(layout.FASTSTART, 100) == 200
+    assert layout.bytes_written(layout.RESERVE, 100) == 100
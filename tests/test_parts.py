@@ -0,0 +1,46 @@
+from src.core import parts
+
+
+def chapters(*hours):
+    return [{"duration": h * 3600} for h in hours]
+
+
+def test_no_caps_or_short_book_is_one_part():
+    assert parts.plan_parts(chapters(1, 2, 3)) == [[0, 1, 2]]
+    assert parts.plan_parts(chapters(1, 2, 3), max_seconds=24 * 3600) == [[0, 1, 2]]
+
+
+def test_parts_respect_the_cap_and_are_balanced():
+    plan = parts.plan_parts(chapters(*[1] * 30), max_seconds=12 * 3600)
+    assert [i for part in plan for i in part] == list(range(30))
+    assert [len(part) for part in plan] == [10, 10, 10]
+
+
+def test_single_chapter_over_the_cap_gets_its_own_part():
+    plan = parts.plan_parts(chapters(2, 30, 2), max_seconds=10 * 3600)
+    assert plan == [[0], [1], [2]]
+
+
+def test_falls_back_to_greedy_when_balancing_would_overflow():
+    durations = [3, 8, 2, 8]
+    assert parts.balanced_parts(durations, 3, 10) is None
+    plan = parts.plan_parts([{"duration": d} for d in durations], max_seconds=10)
+    assert plan == parts.greedy_parts(durations, 10) == [[0], [1, 2], [3]]
+
+
+def test_size_cap_is_converted_to_seconds_with_the_bitrate():
+    # 64 kbit/s is 8000 bytes a second, so 1 hour is 28.8 MB
+    hour_bytes = 3600 * 8000
+    book = chapters(1, 1, 1, 1)
+    assert len(parts.plan_parts(book, max_bytes=2.1 * hour_bytes, kbps=64)) == 2
+    # The same cap holds only half as much audio at twice the bitrate
+    assert len(parts.plan_parts(book, max_bytes=2.1 * hour_bytes, kbps=128)) == 4
+    # SIZE_MARGIN keeps a part that would fill the cap exactly out
+    assert len(parts.plan_parts(book, max_bytes=2 * hour_bytes, kbps=64)) == 4
+
+
+def test_bitrate_and_names():
+    assert parts.bitrate_kbps("128k") == 128
+    assert parts.bitrate_kbps("96000") == 96
+    assert parts.part_path("out/Book.m4b", 2) == "out/Book_Part_2.m4b"
+    assert parts.part_title("Book", 2, 3) == "Book (Part 2 of 3)"
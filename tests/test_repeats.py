@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.core import repeats
+
+RATE = repeats.ANALYSIS_RATE
+
+
+def program_audio(rng, seconds):
+    """Broadband test audio whose level changes every quarter second, like speech or music."""
+    n = int(seconds * RATE)
+    level = np.repeat(rng.uniform(0.2, 1.0, n // 2000 + 1), 2000)[:n]
+    return (rng.normal(0, 5000, n) * level).astype(np.float32)
+
+
+@pytest.mark.parametrize("count", [2, 16, 33, 40])
+def test_shared_intro_found_in_every_later_file(monkeypatch, count):
+    # An identical intro gives each fingerprint one posting per file, so
+    # past 32 files a fixed cap on postings used to drop all of them
+    rng = np.random.default_rng(count)
+    intro = program_audio(rng, 40)
+    clips = {}
+    chapters = []
+    for k in range(count):
+        body = program_audio(rng, 200)
+        audio = np.concatenate((intro, body))
+        path = f"file{k}.mp3"
+        clips[(path, "head")] = audio[:repeats.CLIP_SECONDS * RATE]
+        clips[(path, "tail")] = audio[-repeats.CLIP_SECONDS * RATE:]
+        chapters.append({"path": path, "name": path, "duration": len(audio) / RATE})
+    monkeypatch.setattr(repeats, "decode_clip", lambda path, part: clips[(path, part)])
+
+    found = repeats.find_repeats(chapters)
+
+    assert sorted(r["chapter"] for r in found) == list(range(1, count))
+    for r in found:
+        assert r["part"] == "head"
+        assert r["start"] <= repeats.EDGE_SLACK
+        assert abs(r["end"] - 40) < 2
+
+
+def test_silence_and_constant_hum_are_not_repeats(monkeypatch):
+    t = np.arange(repeats.CLIP_SECONDS * RATE) / RATE
+    hum = (2000 * np.sin(2 * np.pi * 60 * t)).astype(np.float32)
+    silence = np.zeros_like(hum)
+    chapters = [{"path": f"f{k}", "name": "", "duration": 600.0} for k in range(6)]
+    monkeypatch.setattr(repeats, "decode_clip", lambda path, part: silence if part == "head" else hum)
+
+    assert repeats.find_repeats(chapters) == []
+
+
+def test_votes_grow_linearly_with_many_inputs():
+    import tracemalloc
+
+    count = 300
+    frames = repeats.CLIP_SECONDS * RATE // repeats.HOP
+    intro_frames = 60 * RATE // repeats.HOP
+    rng = np.random.default_rng(0)
+    intro = rng.integers(1, 2**32 - 1, intro_frames, dtype=np.uint32)
+    clips, prints = [], []
+    for k in range(count):
+        for part in ("head", "tail"):
+            fp = rng.integers(1, 2**32 - 1, frames, dtype=np.uint32)
+            if part == "head":
+                fp[:intro_frames] = intro
+            clips.append({"chapter": k, "part": part})
+            prints.append(fp)
+    usable = [np.ones(len(p), bool) for p in prints]
+
+    tracemalloc.start()
+    offsets = repeats.best_offsets(prints, usable, clips)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Every later head is aligned with the first one, at offset 0
+    assert offsets == {(0, 2 * k): 0 for k in range(1, count)}
+    # Pairing every posting with every other would need several GB here
+    assert peak < 300 * 1024 * 1024
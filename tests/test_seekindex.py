@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from src.core import seekindex
+
+SAMPLE = os.path.join(os.path.dirname(__file__), os.pardir, "inputs", "file-1.mp3")
+
+pytestmark = pytest.mark.skipif(not os.path.exists(SAMPLE), reason="inputs/file-1.mp3 not present")
+
+
+@pytest.fixture(scope="module")
+def index():
+    return seekindex.scan_mp3(SAMPLE)
+
+
+def test_every_indexed_offset_is_a_frame_header(index):
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    assert list(index.offsets) == sorted(index.offsets)
+    assert len(index.offsets) == -(-index.frame_count // index.stride)
+    for offset in index.offsets:
+        header = seekindex.parse_frame_header(*data[offset:offset + 3])
+        assert header is not None
+        assert header[1] == index.sample_rate
+
+
+def test_walking_stride_frames_lands_on_the_next_offset(index):
+    with open(SAMPLE, "rb") as f:
+        data = f.read()
+    for k in range(len(index.offsets) - 1):
+        pos = index.offsets[k]
+        for _ in range(index.stride):
+            pos += seekindex.parse_frame_header(*data[pos:pos + 3])[0]
+        assert pos == index.offsets[k + 1]
+
+
+def test_locate_covers_the_range_with_preroll(index):
+    start = index.duration / 2
+    first_byte, last_byte, skip = index.locate(start, start + 5)
+    assert first_byte in index.offsets
+    assert last_byte is None or last_byte > first_byte
+    frame_seconds = index.frame_samples / index.sample_rate
+    assert skip >= seekindex.PREROLL_FRAMES * frame_seconds - 1e-9
+    assert skip <= (seekindex.PREROLL_FRAMES + index.stride) * frame_seconds
+
+    assert index.locate(0, 5)[0] == index.offsets[0]
+    assert index.locate(0, 5)[2] == 0
+    assert index.locate(index.duration - 1, index.duration + 10)[1] is None
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    path = tmp_path / "seek.idx"
+    index.save(path)
+    loaded = seekindex.SeekIndex.load(path)
+    assert (loaded.sample_rate, loaded.frame_samples, loaded.frame_count, loaded.stride) == \
+        (index.sample_rate, index.frame_samples, index.frame_count, index.stride)
+    assert list(loaded.offsets) == list(index.offsets)
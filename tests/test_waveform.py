@@ -0,0 +1,53 @@
+import io
+
+import numpy as np
+
+from src.core import waveform
+
+
+class FakeProcess:
+    def __init__(self, pcm):
+        self.stdout = io.BytesIO(pcm)
+
+    def wait(self):
+        return 0
+
+
+def peaks_of(monkeypatch, samples, channels, sample_rate, bins):
+    monkeypatch.setattr(waveform, "source_info", lambda path: (channels, sample_rate, 128000))
+    monkeypatch.setattr(waveform.subprocess, "Popen",
+                        lambda cmd, **kwargs: FakeProcess(samples.astype("<i2").tobytes()))
+    duration = len(samples) / channels / sample_rate
+    return waveform.compute_peaks("in.mp3", duration, bins=bins)
+
+
+def test_peaks_are_exact_source_samples_per_bin(monkeypatch):
+    rate = 44100
+    t = np.arange(rate * 4) / rate
+    left = 16000 * np.sin(2 * np.pi * 440 * t)
+    right = 8000 * np.sin(2 * np.pi * 660 * t)
+    stereo = np.column_stack([left, right]).round().astype(np.int16)
+    stereo[rate * 3 + 100, 1] = 30000  # a single-sample spike in the right channel of bin 3
+
+    peaks = peaks_of(monkeypatch, stereo.ravel(), 2, rate, bins=4)
+
+    assert peaks.shape == (4, 3)
+    for b in range(4):
+        block = stereo[b * rate:(b + 1) * rate]
+        assert peaks[b, 0] == block.min() / 32768.0
+        assert peaks[b, 1] == block.max() / 32768.0
+    assert not any(waveform.is_clipped(row) for row in peaks)
+
+
+def test_clipping_is_counted_at_full_scale_only(monkeypatch):
+    rate = 8000
+    samples = np.zeros(rate * 4, np.int16)
+    samples[100] = 32767                       # bin 0: one sample touching full scale
+    samples[rate + 10:rate + 60] = 32767       # bin 1: flat-topped run
+    samples[2 * rate + 5:2 * rate + 25] = -32768
+    samples[3 * rate:4 * rate] = 32000         # bin 3: loud but not clipped
+
+    peaks = peaks_of(monkeypatch, samples, 1, rate, bins=4)
+
+    assert list(peaks[:, 2]) == [1, 50, 20, 0]
+    assert [waveform.is_clipped(row) for row in peaks] == [False, True, True, False]
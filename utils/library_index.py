@@ -0,0 +1,324 @@
+from mutagen.mp4 import MP4
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB = "outputs/library_index.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    title TEXT,
+    author TEXT,
+    album TEXT,
+    genre TEXT,
+    year TEXT,
+    duration REAL,
+    bitrate INTEGER,
+    channels INTEGER,
+    sample_rate INTEGER,
+    chapter_count INTEGER,
+    has_cover INTEGER,
+    cover_size INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    path TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    path TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    start REAL NOT NULL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_books_author ON books(author);
+CREATE INDEX IF NOT EXISTS idx_books_duration ON books(duration);
+CREATE INDEX IF NOT EXISTS idx_tags_path ON tags(path);
+CREATE INDEX IF NOT EXISTS idx_tags_key ON tags(key, value);
+CREATE INDEX IF NOT EXISTS idx_chapters_path ON chapters(path);
+"""
+
+BOOK_COLUMNS = (
+    "path", "size", "mtime", "title", "author", "album", "genre", "year",
+    "duration", "bitrate", "channels", "sample_rate", "chapter_count",
+    "has_cover", "cover_size", "error"
+)
+
+
+def first_tag(tags, *keys):
+    """Return the first value of the first present tag, as a string."""
+    for key in keys:
+        values = tags.get(key)
+        if values:
+            return str(values[0])
+    return None
+
+
+def decode_tags(tags):
+    """Flatten MP4 tags into (key, value) pairs, skipping cover art."""
+    pairs = []
+    for key, values in tags.items():
+        if key == "covr":
+            continue
+        if key.startswith("----"):
+            # Custom tag, e.g. '----:com.apple.iTunes:ASIN'
+            name = key.split(":")[-1]
+            for value in values:
+                try:
+                    pairs.append((name, bytes(value).decode("utf-8", errors="replace")))
+                except Exception:
+                    pairs.append((name, f"<binary_data: {bytes(value).hex()}>"))
+        else:
+            for value in values:
+                pairs.append((key, str(value)))
+    return pairs
+
+
+def read_book(job):
+    """
+    Read the moov atom of one M4B file.
+
+    mutagen only parses the atom tree and skips over mdat, so the audio
+    payload is never read. Returns (book_row, tag_pairs, chapter_rows).
+    """
+    path, size, mtime = job
+    book = dict.fromkeys(BOOK_COLUMNS)
+    book.update(path=path, size=size, mtime=mtime, chapter_count=0,
+                has_cover=0, cover_size=0)
+    tag_pairs, chapter_rows = [], []
+    try:
+        audio = MP4(path)
+        info = audio.info
+        book.update(
+            duration=info.length,
+            bitrate=getattr(info, "bitrate", None),
+            channels=getattr(info, "channels", None),
+            sample_rate=getattr(info, "sample_rate", None),
+        )
+
+        tags = audio.tags or {}
+        book.update(
+            title=first_tag(tags, "\xa9nam", "\xa9alb"),
+            author=first_tag(tags, "\xa9ART", "aART", "\xa9wrt"),
+            album=first_tag(tags, "\xa9alb"),
+            genre=first_tag(tags, "\xa9gen"),
+            year=first_tag(tags, "\xa9day"),
+        )
+        covers = tags.get("covr") or []
+        if covers:
+            book["has_cover"] = 1
+            book["cover_size"] = sum(len(c) for c in covers)
+        tag_pairs = decode_tags(tags)
+
+        chapters = getattr(audio, "chapters", None) or []
+        for idx, chapter in enumerate(chapters):
+            chapter_rows.append((path, idx, chapter.start, chapter.title))
+        book["chapter_count"] = len(chapter_rows)
+    except Exception as e:
+        book["error"] = str(e)
+    return book, tag_pairs, chapter_rows
+
+
+def find_m4b_files(root):
+    """Walk a directory tree and return {path: (size, mtime)} for every M4B."""
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.lower().endswith(".m4b"):
+                path = os.path.abspath(os.path.join(dirpath, name))
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_size, st.st_mtime)
+    return found
+
+
+def open_db(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def delete_paths(conn, paths):
+    rows = [(p,) for p in paths]
+    for table in ("books", "tags", "chapters"):
+        conn.executemany(f"DELETE FROM {table} WHERE path = ?", rows)
+
+
+def index_library(root, db_path=DEFAULT_DB, workers=None):
+    """
+    Incrementally index every M4B under root into SQLite.
+
+    Only files that are new or whose size/mtime changed since the last run
+    are re-read; rows for files that disappeared from root are removed.
+    """
+    root = os.path.abspath(root)
+    prefix = os.path.join(root, "")
+    conn = open_db(db_path)
+    try:
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in conn.execute(
+                "SELECT path, size, mtime FROM books WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix)
+            )
+        }
+        found = find_m4b_files(root)
+
+        removed = [p for p in known if p not in found]
+        jobs = [(p, size, mtime) for p, (size, mtime) in found.items()
+                if known.get(p) != (size, mtime)]
+
+        print(f"{len(found)} files found: {len(jobs)} to (re)index, "
+              f"{len(found) - len(jobs)} unchanged, {len(removed)} removed")
+
+        with conn:
+            delete_paths(conn, removed + [job[0] for job in jobs])
+
+        if jobs:
+            placeholders = ", ".join("?" for _ in BOOK_COLUMNS)
+            insert_book = f"INSERT INTO books ({', '.join(BOOK_COLUMNS)}) VALUES ({placeholders})"
+            errors = 0
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(read_book, jobs, chunksize=32)
+                # Commit in batches so an interrupted run keeps its progress
+                batch = []
+                for result in results:
+                    batch.append(result)
+                    if len(batch) >= 500:
+                        errors += write_batch(conn, insert_book, batch)
+                        batch = []
+                errors += write_batch(conn, insert_book, batch)
+            if errors:
+                print(f"{errors} files could not be read (see the 'error' column)")
+    finally:
+        conn.close()
+    print(f"Index saved to {os.path.abspath(db_path)}")
+
+
+def write_batch(conn, insert_book, batch):
+    errors = 0
+    with conn:
+        for book, tag_pairs, chapter_rows in batch:
+            conn.execute(insert_book, [book[c] for c in BOOK_COLUMNS])
+            conn.executemany(
+                "INSERT INTO tags (path, key, value) VALUES (?, ?, ?)",
+                [(book["path"], k, v) for k, v in tag_pairs]
+            )
+            conn.executemany(
+                "INSERT INTO chapters (path, idx, start, title) VALUES (?, ?, ?, ?)",
+                chapter_rows
+            )
+            if book["error"]:
+                errors += 1
+    return errors
+
+
+def format_duration(secs):
+    secs = secs or 0
+    return f"{int(secs // 3600):02d}:{int((secs % 3600) // 60):02d}:{int(secs % 60):02d}"
+
+
+def query_library(db_path=DEFAULT_DB, author=None, title=None, missing_cover=False,
+                  min_hours=None, max_hours=None, min_chapters=None, max_chapters=None,
+                  tags=(), limit=None):
+    """Return book rows matching all of the given filters."""
+    where, params = [], []
+    if author:
+        where.append("author LIKE ?")
+        params.append(f"%{author}%")
+    if title:
+        where.append("title LIKE ?")
+        params.append(f"%{title}%")
+    if missing_cover:
+        where.append("has_cover = 0")
+    if min_hours is not None:
+        where.append("duration >= ?")
+        params.append(min_hours * 3600)
+    if max_hours is not None:
+        where.append("duration <= ?")
+        params.append(max_hours * 3600)
+    if min_chapters is not None:
+        where.append("chapter_count >= ?")
+        params.append(min_chapters)
+    if max_chapters is not None:
+        where.append("chapter_count <= ?")
+        params.append(max_chapters)
+    for tag in tags:
+        key, _, value = tag.partition("=")
+        where.append("path IN (SELECT path FROM tags WHERE key = ? AND value LIKE ?)")
+        params += [key, f"%{value}%"]
+
+    sql = "SELECT path, author, title, duration, chapter_count, has_cover, cover_size FROM books"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY author, title"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index an M4B library into SQLite and query it.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help="(Re)index a directory tree")
+    p_index.add_argument("root")
+    p_index.add_argument("--workers", type=int, default=None)
+
+    p_query = sub.add_parser("query", help="Query the index")
+    p_query.add_argument("--author")
+    p_query.add_argument("--title")
+    p_query.add_argument("--missing-cover", action="store_true")
+    p_query.add_argument("--min-hours", type=float)
+    p_query.add_argument("--max-hours", type=float)
+    p_query.add_argument("--min-chapters", type=int)
+    p_query.add_argument("--max-chapters", type=int)
+    p_query.add_argument("--tag", action="append", default=[], metavar="KEY=VALUE")
+    p_query.add_argument("--limit", type=int)
+    p_query.add_argument("--paths", action="store_true", help="Print paths only")
+
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index_library(args.root, args.db, args.workers)
+        return
+
+    if not os.path.exists(args.db):
+        print(f"Error: index not found at {args.db}")
+        sys.exit(1)
+    rows = query_library(
+        args.db, author=args.author, title=args.title, missing_cover=args.missing_cover,
+        min_hours=args.min_hours, max_hours=args.max_hours,
+        min_chapters=args.min_chapters, max_chapters=args.max_chapters,
+        tags=args.tag, limit=args.limit
+    )
+    for path, author, title, duration, chapters, has_cover, cover_size in rows:
+        if args.paths:
+            print(path)
+        else:
+            cover = f"cover {cover_size // 1024} KB" if has_cover else "no cover"
+            print(f"{format_duration(duration)}  {chapters:3d} ch  {cover:>14}  "
+                  f"{author or '?'} - {title or '?'}  [{path}]")
+    if not args.paths:
+        print(f"\n{len(rows)} books")
+
+
+if __name__ == "__main__":
+    main()
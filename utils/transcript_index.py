@@ -0,0 +1,280 @@
+from mutagen.mp4 import MP4
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+DEFAULT_DB = "outputs/transcript_index.db"
+SEGMENTS_SUFFIX = ".segments.jsonl"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcripts (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    source TEXT,
+    book TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    transcript_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    start_ms INTEGER NOT NULL,
+    title TEXT,
+    PRIMARY KEY (transcript_id, idx)
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    transcript_id INTEGER NOT NULL,
+    chapter INTEGER NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_segments_transcript ON segments(transcript_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text, content='segments', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def read_chapters(source):
+    """
+    Return (book title, [(start_ms, title), ...]) for a transcribed file.
+
+    M4B/M4A sources use their embedded title and chapters; anything else
+    (or a source that's gone) is one chapter named after the file.
+    """
+    stem = os.path.splitext(os.path.basename(source or ""))[0] or "?"
+    if source and source.lower().endswith((".m4b", ".m4a")) and os.path.exists(source):
+        audio = MP4(source)
+        tags = audio.tags or {}
+        title = str((tags.get("\xa9nam") or tags.get("\xa9alb") or [stem])[0])
+        chapters = [
+            (int(round(ch.start * 1000)), ch.title)
+            for ch in (getattr(audio, "chapters", None) or [])
+        ]
+        if chapters:
+            if chapters[0][0] > 0:
+                chapters.insert(0, (0, title))
+            return title, chapters
+        return title, [(0, title)]
+    return stem, [(0, stem)]
+
+
+def read_transcript(job):
+    """
+    Parse one segments file written by mp3-transcribe.py.
+
+    Returns (transcript_row, chapter_rows, segment_rows); each segment is
+    assigned to the chapter it starts in.
+    """
+    path, size, mtime = job
+    row = {"path": path, "size": size, "mtime": mtime, "source": None, "book": None, "error": None}
+    chapters, segments = [], []
+    try:
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            row["source"] = header.get("source")
+            row["book"], chapters = read_chapters(row["source"])
+            starts = [start for start, _ in chapters]
+            for line in f:
+                if not line.strip():
+                    continue
+                seg = json.loads(line)
+                start_ms = int(round(seg["start"] * 1000))
+                chapter = max(bisect_right(starts, start_ms) - 1, 0)
+                segments.append((chapter, start_ms, int(round(seg["end"] * 1000)), seg["text"]))
+    except Exception as e:
+        row["error"] = str(e)
+    return row, chapters, segments
+
+
+def find_transcripts(root):
+    """Walk a directory tree and return {path: (size, mtime)} for every segments file."""
+    found = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.endswith(SEGMENTS_SUFFIX):
+                path = os.path.abspath(os.path.join(dirpath, name))
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found[path] = (st.st_size, st.st_mtime)
+    return found
+
+
+def open_db(db_path):
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def delete_transcripts(conn, paths):
+    for path in paths:
+        found = conn.execute("SELECT id FROM transcripts WHERE path = ?", (path,)).fetchone()
+        if found is None:
+            continue
+        tid = found[0]
+        # External-content FTS tables are told what to forget with the 'delete' command
+        conn.execute(
+            "INSERT INTO segments_fts (segments_fts, rowid, text) "
+            "SELECT 'delete', id, text FROM segments WHERE transcript_id = ?", (tid,)
+        )
+        conn.execute("DELETE FROM segments WHERE transcript_id = ?", (tid,))
+        conn.execute("DELETE FROM chapters WHERE transcript_id = ?", (tid,))
+        conn.execute("DELETE FROM transcripts WHERE id = ?", (tid,))
+
+
+def write_transcript(conn, row, chapters, segments):
+    cur = conn.execute(
+        "INSERT INTO transcripts (path, size, mtime, source, book, error) VALUES (?, ?, ?, ?, ?, ?)",
+        (row["path"], row["size"], row["mtime"], row["source"], row["book"], row["error"])
+    )
+    tid = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO chapters (transcript_id, idx, start_ms, title) VALUES (?, ?, ?, ?)",
+        [(tid, idx, start, title) for idx, (start, title) in enumerate(chapters)]
+    )
+    first = conn.execute("SELECT coalesce(max(id), 0) + 1 FROM segments").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO segments (id, transcript_id, chapter, start_ms, end_ms, text) VALUES (?, ?, ?, ?, ?, ?)",
+        [(first + i, tid) + seg for i, seg in enumerate(segments)]
+    )
+    conn.execute(
+        "INSERT INTO segments_fts (rowid, text) SELECT id, text FROM segments WHERE id >= ?", (first,)
+    )
+
+
+def index_transcripts(root, db_path=DEFAULT_DB, workers=None):
+    """
+    Incrementally index every segments file under root into SQLite FTS5.
+
+    Only transcripts that are new or whose size/mtime changed since the
+    last run are re-read; transcripts that disappeared are removed.
+    """
+    root = os.path.abspath(root)
+    prefix = os.path.join(root, "")
+    conn = open_db(db_path)
+    try:
+        known = {
+            path: (size, mtime)
+            for path, size, mtime in conn.execute(
+                "SELECT path, size, mtime FROM transcripts WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix)
+            )
+        }
+        found = find_transcripts(root)
+
+        removed = [p for p in known if p not in found]
+        jobs = [(p, size, mtime) for p, (size, mtime) in found.items()
+                if known.get(p) != (size, mtime)]
+
+        print(f"{len(found)} transcripts found: {len(jobs)} to (re)index, "
+              f"{len(found) - len(jobs)} unchanged, {len(removed)} removed")
+
+        with conn:
+            delete_transcripts(conn, removed + [job[0] for job in jobs])
+
+        if jobs:
+            errors = 0
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # One transaction per transcript, so an interrupted run keeps its progress
+                for row, chapters, segments in pool.map(read_transcript, jobs):
+                    with conn:
+                        write_transcript(conn, row, chapters, segments)
+                    if row["error"]:
+                        errors += 1
+            if errors:
+                print(f"{errors} transcripts could not be read (see the 'error' column)")
+    finally:
+        conn.close()
+    print(f"Index saved to {os.path.abspath(db_path)}")
+
+
+def search_transcripts(query, db_path=DEFAULT_DB, book=None, limit=20):
+    """
+    Full-text search; query uses FTS5 syntax (words, "phrases", OR, NEAR, prefix*).
+
+    Returns dicts with the book, chapter index and title, the offset of
+    the hit into its chapter and into the file (both in ms) and a snippet,
+    best matches first.
+    """
+    sql = """
+        SELECT t.book, t.source, s.chapter, c.title, s.start_ms - c.start_ms, s.start_ms,
+               snippet(segments_fts, 0, '[', ']', '…', 16)
+        FROM segments_fts
+        JOIN segments s ON s.id = segments_fts.rowid
+        JOIN transcripts t ON t.id = s.transcript_id
+        JOIN chapters c ON c.transcript_id = s.transcript_id AND c.idx = s.chapter
+        WHERE segments_fts MATCH ?
+    """
+    params = [query]
+    if book:
+        sql += " AND t.book LIKE ?"
+        params.append(f"%{book}%")
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        keys = ("book", "source", "chapter", "chapter_title", "offset_ms", "file_offset_ms", "snippet")
+        return [dict(zip(keys, row)) for row in conn.execute(sql, params)]
+    finally:
+        conn.close()
+
+
+def format_ms(ms):
+    secs, ms = divmod(ms, 1000)
+    return f"{secs // 3600:02d}:{(secs % 3600) // 60:02d}:{secs % 60:02d}.{ms:03d}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index Whisper transcripts into SQLite and search them.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="SQLite index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_index = sub.add_parser("index", help=f"(Re)index every *{SEGMENTS_SUFFIX} under a directory")
+    p_index.add_argument("root")
+    p_index.add_argument("--workers", type=int, default=None)
+
+    p_search = sub.add_parser("search", help="Search the index")
+    p_search.add_argument("query", nargs="+", help='Words, "a phrase", prefix*, OR, NEAR(...)')
+    p_search.add_argument("--book", help="Only books whose title contains this")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--json", action="store_true", help="Print hits as JSON lines")
+
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index_transcripts(args.root, args.db, args.workers)
+        return
+
+    if not os.path.exists(args.db):
+        print(f"Error: index not found at {args.db}")
+        sys.exit(1)
+    try:
+        hits = search_transcripts(" ".join(args.query), args.db, book=args.book, limit=args.limit)
+    except sqlite3.OperationalError as e:
+        print(f"Error: bad query: {e}")
+        sys.exit(1)
+    for hit in hits:
+        if args.json:
+            print(json.dumps(hit, ensure_ascii=False))
+        else:
+            print(f"{hit['book']} / {hit['chapter_title']} @ {format_ms(hit['offset_ms'])} "
+                  f"({hit['offset_ms']} ms): {hit['snippet']}")
+    if not args.json:
+        print(f"\n{len(hits)} hits")
+
+
+if __name__ == "__main__":
+    main()